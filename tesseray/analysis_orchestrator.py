@@ -0,0 +1,174 @@
+import asyncio
+import chess
+import chess.engine
+import chess.pgn
+from typing import Callable, Iterable, List, Optional
+
+from blunder_check import blunders_from_results
+from blunder_records import BlunderRecord
+
+
+class _GameJob:
+    """A game whose positions are being analysed."""
+
+    def __init__(self, game: chess.pgn.Game, pgn_file, game_id: int, positions: int):
+        self.game = game
+        self.pgn_file = pgn_file
+        self.game_id = game_id
+        self.results: List[Optional[chess.engine.InfoDict]] = [None] * positions
+        self.remaining = positions
+
+
+class AnalysisOrchestrator:
+    """
+    Analyses PGN files with several UCI engines from a single process.
+
+    A reader coroutine parses games and feeds their positions into a bounded
+    queue, and one worker coroutine per engine takes the next position as
+    soon as its engine is idle. Parsing overlaps with the engine searches,
+    and all games live in one Python heap instead of one per worker process.
+
+    Blunders are reported through *on_blunders* once all positions of a game
+    have been analysed, in the order the games complete. An engine that
+    crashes or errors is restarted once per position; a position that still
+    fails is counted in *failures* and left without a result. If an engine
+    can not be started at all, :func:`run()` stops and raises the error.
+    """
+
+    def __init__(self, stockfish_path, *, engines=4, depth=10, limit=150, queue_size=256,
+                 options: chess.engine.ConfigMapping = {},
+                 on_blunders: Optional[Callable[[List[BlunderRecord]], None]] = None):
+        self.stockfish_path = stockfish_path
+        self.engines = engines
+        self.depth = depth
+        self.limit = limit
+        self.queue_size = queue_size
+        self.options = dict(options)
+        self.on_blunders = on_blunders
+        self.games = 0
+        self.positions = 0
+        self.restarts = 0
+        self.failures = 0
+
+    async def _open_engine(self) -> chess.engine.Protocol:
+        _, protocol = await chess.engine.popen_uci(self.stockfish_path)
+        if self.options:
+            await protocol.configure(self.options)
+        return protocol
+
+    async def _read_games(self, pgn_files: Iterable[str], queue: "asyncio.Queue") -> None:
+        for pgn_file in pgn_files:
+            with open(pgn_file) as pgn:
+                game_id = 0
+                while True:
+                    game = chess.pgn.read_game(pgn)
+                    if game is None:
+                        break
+                    game_id += 1
+
+                    moves = list(game.mainline_moves())
+                    job = _GameJob(game, pgn_file, game_id, len(moves) + 1)
+                    board = game.board()
+                    await queue.put((job, 0, board.copy()))
+                    for index, move in enumerate(moves, 1):
+                        board.push(move)
+                        await queue.put((job, index, board.copy()))
+
+                    # Let the workers pick up results even if the queue never fills.
+                    await asyncio.sleep(0)
+
+        for _ in range(self.engines):
+            await queue.put(None)
+
+    async def _work(self, queue: "asyncio.Queue") -> None:
+        protocol = await self._open_engine()
+        limit = chess.engine.Limit(depth=self.depth)
+        try:
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    job, index, board = item
+                    try:
+                        info: Optional[chess.engine.InfoDict] = await protocol.analyse(board, limit)
+                    except chess.engine.EngineError:
+                        # Start over with a fresh engine. Failing to start
+                        # one ends the worker and the run.
+                        self.restarts += 1
+                        try:
+                            await asyncio.wait_for(protocol.quit(), 10.0)
+                        except (chess.engine.EngineError, asyncio.TimeoutError):
+                            pass
+                        protocol = await self._open_engine()
+                        try:
+                            info = await protocol.analyse(board, limit)
+                        except chess.engine.EngineError:
+                            # The game is still completed, without a result
+                            # for this position.
+                            self.failures += 1
+                            info = None
+
+                    job.results[index] = info
+                    job.remaining -= 1
+                    self.positions += 1
+                    if not job.remaining:
+                        self._finish(job)
+                finally:
+                    queue.task_done()
+        finally:
+            try:
+                await asyncio.wait_for(protocol.quit(), 10.0)
+            except (chess.engine.EngineError, asyncio.TimeoutError):
+                pass
+
+    def _finish(self, job: _GameJob) -> None:
+        self.games += 1
+        records = blunders_from_results(job.game, job.results, job.pgn_file, job.game_id, self.limit)
+        if self.on_blunders is not None:
+            self.on_blunders(records)
+
+    async def run(self, pgn_files: Iterable[str]) -> None:
+        """
+        Analyses all games of *pgn_files*. The first error of the reader or
+        of a worker cancels the others and is raised.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        tasks = [asyncio.create_task(self._read_games(pgn_files, queue))]
+        tasks += [asyncio.create_task(self._work(queue)) for _ in range(self.engines)]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def orchestrate(pgn_files: Iterable[str], stockfish_path, **kwargs) -> List[BlunderRecord]:
+    """Runs an AnalysisOrchestrator to completion and returns all blunders."""
+    blunders: List[BlunderRecord] = []
+    orchestrator = AnalysisOrchestrator(stockfish_path, on_blunders=blunders.extend, **kwargs)
+    asyncio.run(orchestrator.run(pgn_files))
+    return blunders
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+    from blunder_records import open_writer
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'test_data'
+    stockfish_path = 'engines/stockfish'
+    engines = os.cpu_count() or 1
+
+    pgn_files = [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(".pgn")]
+    os.makedirs("csv", exist_ok=True)
+
+    start = time.time()
+    with open_writer(os.path.join("csv", "blunder_check_orchestrated.csv")) as writer:
+        orchestrator = AnalysisOrchestrator(stockfish_path, engines=engines, on_blunders=writer.write_many)
+        asyncio.run(orchestrator.run(pgn_files))
+    print(f"Analysed {orchestrator.positions} positions of {orchestrator.games} games with {engines} engines in {time.time() - start:.1f}s")
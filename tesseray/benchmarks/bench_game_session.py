@@ -0,0 +1,80 @@
+"""
+Compares the depth that the engine reaches per unit of time when the plies
+of a game are analysed as independent searches, each one starting a new
+game, and with a GameAnalysisSession walking the game forward and in
+reverse.
+
+    python benchmarks/bench_game_session.py engines/stockfish test_data/games.pgn --time 0.05 --games 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.engine
+import chess.pgn
+
+
+def independent(engine, board, limit):
+    infos = []
+    position = board.root()
+    for move in [None] + board.move_stack:
+        if move is not None:
+            position.push(move)
+        infos.append(engine.analyse(position, limit, game=object()))
+    return infos
+
+
+def session(reverse):
+    def run(engine, board, limit):
+        return chess.engine.GameAnalysisSession(engine, board, reverse=reverse).analyse(limit)
+    return run
+
+
+MODES = {
+    "independent": independent,
+    "session": session(False),
+    "session-reverse": session(True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("engine")
+    parser.add_argument("pgn")
+    parser.add_argument("--time", type=float, default=0.05, help="seconds per position")
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--hash", type=int, default=64, help="hash size in MB")
+    args = parser.parse_args()
+
+    boards = []
+    with open(args.pgn) as pgn:
+        while len(boards) < args.games:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            boards.append(game.end().board())
+
+    limit = chess.engine.Limit(time=args.time)
+    with chess.engine.SimpleEngine.popen_uci(args.engine) as engine:
+        if "Hash" in engine.options:
+            engine.configure({"Hash": args.hash})
+
+        print(f"{'mode':<16} {'positions':>9} {'seconds':>8} {'mean depth':>10} {'depth/s':>8}")
+        for name, run in MODES.items():
+            depths = []
+            start = time.perf_counter()
+            for board in boards:
+                depths.extend(info.get("depth", 0) for info in run(engine, board, limit))
+            elapsed = time.perf_counter() - start
+            print(f"{name:<16} {len(depths):>9} {elapsed:>8.2f} {statistics.mean(depths):>10.2f} {sum(depths) / elapsed:>8.1f}")
+        engine.quit()
+
+
+if __name__ == "__main__":
+    main()
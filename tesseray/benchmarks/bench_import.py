@@ -0,0 +1,67 @@
+"""
+Measures the cost of importing the chess package in a fresh interpreter,
+like every multiprocessing worker and every short-lived script pays it:
+wall time of the import, memory it allocates, and the same memory after a
+short perft has filled the attack tables that searches actually use.
+
+    python benchmarks/bench_import.py --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tracing allocations slows the import down, so the import is either timed
+# or traced, never both.
+CHILD = """
+import json, sys, time, tracemalloc
+depth, trace = int(sys.argv[1]), sys.argv[2] == "trace"
+if trace:
+    tracemalloc.start()
+start = time.perf_counter()
+import chess
+elapsed = time.perf_counter() - start
+imported = tracemalloc.get_traced_memory()[0]
+
+def perft(board, depth):
+    if depth < 1:
+        return 1
+    nodes = 0
+    for move in board.generate_legal_moves():
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+for fen in [chess.STARTING_FEN, "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"]:
+    perft(chess.Board(fen), depth)
+print(json.dumps([elapsed, imported, tracemalloc.get_traced_memory()[0]]))
+"""
+
+
+def run_child(depth, trace=False):
+    output = subprocess.run([sys.executable, "-c", CHILD, str(depth), "trace" if trace else "time"], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20, help="number of fresh interpreters")
+    parser.add_argument("--depth", type=int, default=2, help="perft depth used to warm the attack tables")
+    args = parser.parse_args()
+
+    times = [run_child(args.depth)[0] for _ in range(args.runs)]
+    print(f"import chess: median {statistics.median(times) * 1000:.1f} ms, best {min(times) * 1000:.1f} ms over {args.runs} runs")
+
+    _, imported, warmed = run_child(args.depth, trace=True)
+    print(f"memory after import: {imported / 1024:.0f} KiB")
+    print(f"memory after perft({args.depth}): {warmed / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Measures Board.push() and Board.pop() in a perft move generation loop, also
+after a repetition query has made the board count positions, when
+replaying the mainlines of PGN games and when branching off copies like
+the PGN reader does for variations, and the memory that the move stack
+retains per ply.
+
+    python benchmarks/bench_push_pop.py test_data/games.pgn --depth 4 --games 200
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.pgn
+
+
+def perft(board, depth):
+    if depth < 1:
+        return 1
+    nodes = 0
+    for move in board.generate_legal_moves():
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def replay(games):
+    plies = 0
+    for moves in games:
+        board = chess.Board()
+        for move in moves:
+            board.push(move)
+        plies += len(moves)
+        while board.move_stack:
+            board.pop()
+    return plies
+
+
+def branch(games):
+    # Like a PGN variation: copy the board, take back the last move on the
+    # copy and play on, while the original continues the mainline.
+    plies = 0
+    for moves in games:
+        board = chess.Board()
+        for move in moves:
+            board.push(move)
+            variation = board.copy()
+            variation.pop()
+            variation.push(move)
+        plies += len(moves)
+    return plies
+
+
+def retained_per_ply(games):
+    # Moves are pushed from a separate list, so that only what the board
+    # keeps for each ply is counted.
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = []
+    for moves in games:
+        board = chess.Board()
+        for move in moves:
+            board.push(chess.Move(move.from_square, move.to_square, move.promotion))
+        boards.append(board)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / sum(len(board.move_stack) for board in boards)
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pgn")
+    parser.add_argument("--depth", type=int, default=4, help="perft depth from the starting position")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    games = []
+    with open(args.pgn) as pgn:
+        while len(games) < args.games:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            games.append(list(game.mainline_moves()))
+
+    nodes, elapsed = best_of(args.repeat, perft, chess.Board(), args.depth)
+    print(f"perft({args.depth}): {nodes} nodes in {elapsed:.3f}s, {nodes / elapsed:.0f} nodes/s")
+
+    board = chess.Board()
+    board.is_game_over(claim_draw=True)
+    nodes, elapsed = best_of(args.repeat, perft, board, args.depth)
+    print(f"perft({args.depth}) after a repetition query: {nodes} nodes in {elapsed:.3f}s, {nodes / elapsed:.0f} nodes/s")
+
+    plies, elapsed = best_of(args.repeat, replay, games)
+    print(f"replay: {plies} plies of {len(games)} games in {elapsed:.3f}s, {plies / elapsed:.0f} plies/s (push and pop)")
+
+    plies, elapsed = best_of(args.repeat, branch, games)
+    print(f"branch: {plies} copies of {len(games)} games in {elapsed:.3f}s, {plies / elapsed:.0f} copies/s (copy, pop and push)")
+
+    print(f"move stack: {retained_per_ply(games):.0f} bytes per ply")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measures the Python overhead of chess.engine by replaying a recorded engine
+session at full speed, so that no engine is needed and the engine's own
+search time does not count.
+
+Record a session once, on a machine with the engine:
+
+    python benchmarks/bench_replay.py record engines/stockfish test_data/games.pgn session.jsonl
+
+and replay it anywhere:
+
+    python benchmarks/bench_replay.py replay test_data/games.pgn session.jsonl --repeat 20
+
+The workload analyses every mainline position of the first games of the
+PGN file one by one with analyse(), again as one batch with
+analyse_many(), plays the first position with play() and iterates over
+analysis() of the last one.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.engine
+import chess.pgn
+
+
+def load_boards(pgn_file, games):
+    boards = []
+    with open(pgn_file) as pgn:
+        for _ in range(games):
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            board = game.board()
+            boards.append(board.copy())
+            for move in game.mainline_moves():
+                board.push(move)
+                boards.append(board.copy())
+    return boards
+
+
+def workload(engine, boards, limit):
+    timings = {}
+
+    start = time.perf_counter()
+    for board in boards:
+        engine.analyse(board, limit)
+    timings["analyse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in engine.analyse_many(boards, limit):
+        pass
+    timings["analyse_many"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.play(boards[0], limit)
+    timings["play"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with engine.analysis(boards[-1], limit) as analysis:
+        for _ in analysis:
+            pass
+    timings["analysis"] = time.perf_counter() - start
+
+    engine.quit()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    record = subparsers.add_parser("record")
+    record.add_argument("engine")
+    replay = subparsers.add_parser("replay")
+    replay.add_argument("--repeat", type=int, default=10)
+    replay.add_argument("--timing", action="store_true", help="answer with the recorded delays")
+    for subparser in [record, replay]:
+        subparser.add_argument("pgn")
+        subparser.add_argument("session")
+        subparser.add_argument("--games", type=int, default=3)
+        subparser.add_argument("--depth", type=int, default=10)
+    args = parser.parse_args()
+
+    boards = load_boards(args.pgn, args.games)
+    limit = chess.engine.Limit(depth=args.depth)
+
+    if args.mode == "record":
+        with chess.engine.SimpleEngine.popen_uci(args.engine, record=args.session) as engine:
+            timings = workload(engine, boards, limit)
+        print(f"Recorded {len(boards)} positions to {args.session}: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+        return
+
+    runs = []
+    for _ in range(args.repeat):
+        with chess.engine.SimpleEngine.replay(args.session, timing=args.timing) as engine:
+            runs.append(workload(engine, boards, limit))
+
+    print(f"{'call':<14} {'median ms':>10} {'min ms':>8} {'us each':>12}")
+    for name in runs[0]:
+        samples = [run[name] for run in runs]
+        positions = len(boards) if name.startswith("analyse") else 1
+        print(f"{name:<14} {statistics.median(samples) * 1000:>10.2f} {min(samples) * 1000:>8.2f} {statistics.median(samples) / positions * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
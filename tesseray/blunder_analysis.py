@@ -4,8 +4,13 @@ import os
 import logging
 import re
 import datetime
+import threading
 from multiprocessing import Pool, cpu_count
 from dataclasses import dataclass
+from typing import Optional
+from pgn_shards import GameShard, read_shard, scan_shards
+from position_resolver import analyse_many, get_resolver
+from worker_engines import get_engine_pool
 
 flag = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 os.makedirs('logs', exist_ok=True)
@@ -17,50 +22,116 @@ class GameInfo:
     stockfish_path: str
     blunder_threshold: int
     file: str
-    game: chess.pgn.Game
+    shard: GameShard
     game_num: int
     blunder_definition: str
+    cache_path: Optional[str] = None
+    depth: int = 10
+    # Depth of a cheap first pass that selects candidate plies for the full
+    # depth search, or None to search every ply at full depth.
+    scan_depth: Optional[int] = None
+    # Plies whose first pass swing exceeds this fraction of the threshold
+    # are candidates.
+    candidate_fraction: float = 0.5
+    # Optional Polyglot book and Syzygy directory. Book moves are skipped as
+    # theory and tablebase positions are resolved without the engine.
+    book_path: Optional[str] = None
+    syzygy_path: Optional[str] = None
 
 def analyze_game(game_info: GameInfo):
-    engine = chess.engine.SimpleEngine.popen_uci(game_info.stockfish_path)
-    board = game_info.game.board()
-    game_key = f'{game_info.file}-{game_info.game.headers["Event"]}-{game_info.game_num}'
+    # Workers parse their own game, so only the shard location is sent over IPC.
+    game = read_shard(game_info.shard)
+    resolver = get_resolver(game_info.book_path, game_info.syzygy_path)
+    with get_engine_pool(game_info.stockfish_path, game_info.cache_path).engine() as engine:
+        return _analyze_game(engine, game_info, game, resolver)
+
+def _mainline_positions(game: chess.pgn.Game):
+    # Yields the same board object for every ply, positioned before the move.
+    board = game.board()
+    for node in game.mainline():
+        if board.is_game_over():
+            break
+        yield board, node
+        board.push(node.move)
+
+def _book_plies(game, resolver):
+    # Number of leading moves that are in the opening book.
+    count = 0
+    if resolver is not None and resolver.book is not None:
+        for board, node in _mainline_positions(game):
+            if node.move not in resolver.book_moves(board):
+                break
+            count += 1
+    return count
+
+def _analyse_plies(engine, game, limit, plies=None, infos=None, resolver=None, start=0):
+    # The positions are submitted to the engine as one batch.
+    infos = list(infos) if infos is not None else []
+    boards = {}
+    for ply, (board, _) in enumerate(_mainline_positions(game)):
+        if plies is None:
+            infos.append(None)
+            if ply >= start:
+                boards[ply] = board.copy()
+        elif ply in plies:
+            boards[ply] = board.copy()
+    for ply, info in zip(boards, analyse_many(engine, boards.values(), limit, resolver)):
+        infos[ply] = info
+    return infos
+
+def _pov_score(info):
+    if info["score"].is_mate():
+        return -1e6 * info["score"].relative.score(mate_score=1e6)
+    else:
+        return info["score"].relative.score()
+
+def _swing(previous_info, info):
+    best_score, score = _pov_score(previous_info), _pov_score(info)
+    if score is None or best_score is None:
+        return 0
+    return best_score + score
+
+def _analyze_game(engine, game_info: GameInfo, game: chess.pgn.Game, resolver=None):
+    game_key = f'{game_info.file}-{game.headers["Event"]}-{game_info.game_num}'
     blunders = []
-    previous_info = None
-    time_control = game_info.game.headers.get("TimeControl", "")
+    time_control = game.headers.get("TimeControl", "")
     initial_time = int(time_control.split("+")[0]) if "+" in time_control else None
 
-    for node in game_info.game.mainline():
-        if board.is_game_over():
-            break
+    # Positions that are only reached and left by book moves are theory and
+    # never searched.
+    start = _book_plies(game, resolver)
+
+    limit = chess.engine.Limit(depth=game_info.depth)
+    if game_info.scan_depth is None:
+        infos = _analyse_plies(engine, game, limit, resolver=resolver, start=start)
+        candidates = set(range(start + 1, len(infos)))
+    else:
+        # Cheap first pass over every ply. Only plies whose swing comes
+        # close to the threshold are searched again at full depth, together
+        # with the position before them.
+        infos = _analyse_plies(engine, game, chess.engine.Limit(depth=game_info.scan_depth), resolver=resolver, start=start)
+        candidates = {ply for ply in range(start + 1, len(infos))
+                      if _swing(infos[ply - 1], infos[ply]) > game_info.candidate_fraction * game_info.blunder_threshold}
+        infos = _analyse_plies(engine, game, limit, candidates | {ply - 1 for ply in candidates}, infos, resolver)
+
+    for ply, (board, node) in enumerate(_mainline_positions(game)):
+        if ply not in candidates:
+            continue
 
         move = node.move
-        info = engine.analyse(board, chess.engine.Limit(depth=10))
-
-        if previous_info is not None:
-            best_move = previous_info["pv"][0]
-            if previous_info["score"].is_mate():
-                best_score = -1e6 * previous_info["score"].relative.score(mate_score=1e6)
-            else:
-                best_score = previous_info["score"].relative.score()
-
-            if info["score"].is_mate():
-                score = -1e6 * info["score"].relative.score(mate_score=1e6)
-            else:
-                score = info["score"].relative.score()
-
-            if game_info.blunder_definition == "bad_move":
-                if best_move != move and score is not None and best_score is not None and best_score + score > game_info.blunder_threshold:
-                    timestamp = get_timestamp(node.comment, initial_time)
-                    blunders.append((board.fen(), move.uci(), best_move.uci(), score, timestamp))
-            elif game_info.blunder_definition == "evaluation_drop":
-                # define "evaluation_drop"
-                pass
-
-        board.push(move)
-        previous_info = info
-
-    engine.quit()
+        previous_info, info = infos[ply - 1], infos[ply]
+        best_move = previous_info["pv"][0]
+        best_score = _pov_score(previous_info)
+        score = _pov_score(info)
+
+        if game_info.blunder_definition == "bad_move":
+            if best_move != move and score is not None and best_score is not None and best_score + score > game_info.blunder_threshold:
+                timestamp = get_timestamp(node.comment, initial_time)
+                blunders.append((board.fen(), move.uci(), best_move.uci(), score, timestamp))
+        elif game_info.blunder_definition == "evaluation_drop":
+            # define "evaluation_drop"
+            pass
+
     return game_key, blunders
 
 
@@ -81,34 +152,64 @@ def get_timestamp(comment, initial_time):
             time_remaining_percentage = (time_remaining / initial_time) * 100
             return f"{time_remaining_percentage:.2f}%"
 
-def find_blunders(pgn_dir_path, stockfish_path, blunder_definition="bad_move", blunder_threshold=150):
-    game_infos = []
-    
-    def load_games():
-        for root, _, files in os.walk(pgn_dir_path):
-            for file in files:
-                if file.endswith('.pgn'):
-                    pgn_file_path = os.path.join(root, file)
-                    with open(pgn_file_path) as pgn:
-                        game_num = 1
-                        while True:
-                            game = chess.pgn.read_game(pgn)
-                            if game is None:
-                                break
-                            
-                            yield GameInfo(stockfish_path, blunder_threshold, file, game, game_num, blunder_definition)
-                            game_num += 1
-
-    with Pool(cpu_count()) as p:
-        blunders = dict(p.map(analyze_game, load_games()))
-
-    return blunders
+def load_games(pgn_dir_path, stockfish_path, blunder_definition="bad_move", blunder_threshold=150, cache_path=None, scan_depth=None, book_path=None, syzygy_path=None):
+    for root, _, files in os.walk(pgn_dir_path):
+        for file in files:
+            if file.endswith('.pgn'):
+                pgn_file_path = os.path.join(root, file)
+                for game_num, shard in enumerate(scan_shards(pgn_file_path), 1):
+                    yield GameInfo(stockfish_path, blunder_threshold, file, shard, game_num, blunder_definition, cache_path,
+                                       scan_depth=scan_depth, book_path=book_path, syzygy_path=syzygy_path)
+
+def iter_blunders(pgn_dir_path, stockfish_path, blunder_definition="bad_move", blunder_threshold=150, cache_path=None, max_in_flight=None, scan_depth=None, book_path=None, syzygy_path=None):
+    """
+    Yields (game_key, blunders) in completion order. At most *max_in_flight*
+    games are dispatched but not yet consumed, so memory stays flat no matter
+    how many games the directory holds.
+
+    With *scan_depth*, every ply is first searched to that depth and only
+    plies that might be blunders are searched again at full depth.
+
+    With *book_path* and *syzygy_path*, book moves are skipped as theory and
+    endgame positions are resolved from tablebases instead of the engine.
+    """
+    processes = cpu_count()
+    in_flight = threading.Semaphore(max_in_flight or 2 * processes)
+    stopped = threading.Event()
+
+    def bounded(game_infos):
+        # Runs on the pool's task feeder thread, which would otherwise
+        # consume the whole generator up front.
+        for game_info in game_infos:
+            in_flight.acquire()
+            if stopped.is_set():
+                return
+            yield game_info
+
+    game_infos = load_games(pgn_dir_path, stockfish_path, blunder_definition, blunder_threshold, cache_path, scan_depth, book_path, syzygy_path)
+    with Pool(processes) as p:
+        try:
+            for result in p.imap_unordered(analyze_game, bounded(game_infos)):
+                in_flight.release()
+                yield result
+            # Let the workers exit normally so that their engines are shut down.
+            p.close()
+            p.join()
+        finally:
+            # Unblock the feeder thread if the consumer stopped early.
+            stopped.set()
+            in_flight.release()
+
+def find_blunders(pgn_dir_path, stockfish_path, blunder_definition="bad_move", blunder_threshold=150, cache_path=None, scan_depth=None, book_path=None, syzygy_path=None):
+    return dict(iter_blunders(pgn_dir_path, stockfish_path, blunder_definition, blunder_threshold, cache_path,
+                              scan_depth=scan_depth, book_path=book_path, syzygy_path=syzygy_path))
 
 if __name__ == '__main__':
     stockfish_path = "engines/stockfish"
     pgn_dir_path = "test_data"
-    blunders = find_blunders(pgn_dir_path, stockfish_path, blunder_definition="bad_move")
-    for game, game_blunders in blunders.items():
+    os.makedirs('cache', exist_ok=True)
+    blunders = iter_blunders(pgn_dir_path, stockfish_path, blunder_definition="bad_move", cache_path="cache/analysis.sqlite3")
+    for game, game_blunders in blunders:
         logging.info(f"In game {game}, there were {len(game_blunders)} blunders.")
         print(f"In game {game}, there were {len(game_blunders)} blunders.")
         for blunder in game_blunders:
@@ -2,26 +2,27 @@ import chess.engine
 import chess.pgn
 import os
 import multiprocessing
-import csv
 from datetime import datetime
-
-def log_blunders(csv_dir, all_blunders):
+from blunder_records import BlunderRecord, open_writer
+from corpus_plan import analyse_plan, plan_corpus
+from pgn_shards import read_shard
+from position_resolver import analyse_many, get_resolver
+from run_state import RunState
+from worker_engines import get_engine_pool
+
+def log_blunders(csv_dir, all_blunders, format="csv"):
+    """
+    Streams blunder records to a new file in *csv_dir*. *all_blunders* is
+    an iterable of record lists, one per game, that is consumed lazily, so
+    output is flushed as games finish.
+    """
     flag = datetime.now().strftime('%Y%m%d%H%M%S')
-    csv_file = os.path.join(csv_dir, f"blunder_check_{flag}.csv")
-
-    with open(csv_file, 'w', newline='') as csv_f:
-        writer = csv.writer(csv_f)
-        writer.writerow(["game_file", "game_id", "move_type", "move_number", "actual_move", "best_move"])
-        for game_header, blunders_list in all_blunders:
-            game_info = game_header.split(", Game ID: ")
-            game_file, game_id = game_info[0].split(": ")[1], game_info[1]
-            for blunder in blunders_list:
-                blunder_info = blunder.split(', Best move: ')
-                move_info = blunder_info[0].split(": ")
-                move_type, actual_move_full = move_info[0], move_info[1]
-                move_number, actual_move = actual_move_full.split('. ')
-                best_move = blunder_info[1]
-                writer.writerow([game_file, game_id, move_type, move_number, actual_move, best_move])
+    extension = {"csv": ".csv", "jsonl": ".jsonl"}.get(format, "")
+    output_path = os.path.join(csv_dir, f"blunder_check_{flag}{extension}")
+
+    with open_writer(output_path, format) as writer:
+        for game_blunders in all_blunders:
+            writer.write_many(game_blunders)
 
 def game_generator(pgn_file):
     with open(pgn_file) as f:
@@ -31,80 +32,161 @@ def game_generator(pgn_file):
                 break
             yield game
 
-def evaluate_game(pgn_file, stockfish_path, limit=150):
-    blunders = []
+def evaluate_game(pgn_file, stockfish_path, limit=150, single_search=False, cache_path=None, book_path=None, syzygy_path=None):
+    resolver = get_resolver(book_path, syzygy_path)
+    with get_engine_pool(stockfish_path, cache_path).engine() as engine:
+        return _evaluate_games(engine, pgn_file, limit, single_search, resolver)
 
-    engine = chess.engine.SimpleEngine.popen_uci(stockfish_path)
+def _evaluate_games(engine, pgn_file, limit, single_search, resolver=None):
+    blunders = []
 
     game_id = 0  # Identifier for each game in a file
     for game in game_generator(pgn_file):
         game_id += 1  
-        game_blunders = []
-        node = game
-        game_header = f"Game File: {pgn_file}, Game ID: {game_id}\n"
-        best_move = None
-        while not node.is_end():
-            next_node = node.variations[0]
-            move = next_node.move
-
-            # Evaluate the position before the move
-            result = engine.analyse(node.board(), chess.engine.Limit(depth=10))
-            score_before = result["score"].relative.score()
-            if score_before is None:
-                # Mate in x situation
-                score_before = (30000 if result["score"].relative.is_mate() else 0)
-
-            # Find the best move before the blunder
-            if best_move is None:
-                best_move_result = engine.play(node.board(), chess.engine.Limit(depth=10))
-                best_move = best_move_result.move
-
-            # Evaluate the position after the move
-            result = engine.analyse(next_node.board(), chess.engine.Limit(depth=10))
-            score_after = result["score"].relative.score()
-            if score_after is None:
-                # Mate in x situation
-                score_after = (30000 if result["score"].relative.is_mate() else 0)
-
-            if abs(score_before + score_after) > limit:
-                move_number = (node.ply() + 1) // 2
-                if node.board().turn:
-                    move_notation = f"{move_number}. {node.board().san(move)}"
-                else:
-                    move_notation = f"{move_number}. ...{node.board().san(move)}"
-                best_move_notation = node.board().san(best_move)
-                blunder_msg = f"??: {move_notation}, Best move: {best_move_notation}"
-                game_blunders.append(blunder_msg)
-
-            node = next_node
-            best_move = None
-        
-        if len(game_blunders) == 0:
-            print(f"No blunders found in Game ID {game_id} from file {pgn_file}")
-        
-        blunders.append((game_header, game_blunders))
-
-    engine.quit()
+        blunders.extend(_evaluate_game(engine, game, pgn_file, game_id, limit, single_search, resolver))
 
     return blunders
 
-def process_new_files(previous_files, directory):
-    current_files = set(os.listdir(directory))
-    new_files = current_files.difference(previous_files)
-    return new_files
+def evaluate_shard(shard, game_id, stockfish_path, limit=150, single_search=False, cache_path=None, book_path=None, syzygy_path=None):
+    # Workers parse their own game, so only the shard location is sent over IPC.
+    game = read_shard(shard)
+    resolver = get_resolver(book_path, syzygy_path)
+    with get_engine_pool(stockfish_path, cache_path).engine() as engine:
+        return _evaluate_game(engine, game, shard.path, game_id, limit, single_search, resolver)
+
+def _evaluate_shard_star(args):
+    return args[0], evaluate_shard(*args)
+
+def _evaluate_game(engine, game, pgn_file, game_id, limit, single_search, resolver=None):
+    # The opening book and tablebases are only consulted in single search mode.
+    if single_search:
+        game_blunders = _game_blunders_single_search(engine, game, pgn_file, game_id, limit, resolver)
+    else:
+        game_blunders = _game_blunders(engine, game, pgn_file, game_id, limit)
+
+    if len(game_blunders) == 0:
+        print(f"No blunders found in Game ID {game_id} from file {pgn_file}")
+
+    return game_blunders
+
+def _relative_score(result):
+    score = result["score"].relative.score()
+    if score is None:
+        # Mate in x situation
+        score = (30000 if result["score"].relative.is_mate() else 0)
+    return score
+
+def _blunder_record(board, ply, move, best_move, pgn_file, game_id):
+    move_number = (ply + 1) // 2
+    if board.turn:
+        actual_move = board.san(move)
+    else:
+        actual_move = f"...{board.san(move)}"
+    return BlunderRecord(pgn_file, game_id, "??", move_number, actual_move, board.san(best_move))
+
+def _game_blunders(engine, game, pgn_file, game_id, limit):
+    game_blunders = []
+    node = game
+    best_move = None
+    while not node.is_end():
+        next_node = node.variations[0]
+        move = next_node.move
+
+        # Evaluate the position before the move
+        result = engine.analyse(node.board(), chess.engine.Limit(depth=10))
+        score_before = _relative_score(result)
+
+        # Find the best move before the blunder
+        if best_move is None:
+            best_move_result = engine.play(node.board(), chess.engine.Limit(depth=10))
+            best_move = best_move_result.move
+
+        # Evaluate the position after the move
+        result = engine.analyse(next_node.board(), chess.engine.Limit(depth=10))
+        score_after = _relative_score(result)
+
+        if abs(score_before + score_after) > limit:
+            game_blunders.append(_blunder_record(node.board(), node.ply(), move, best_move, pgn_file, game_id))
+
+        node = next_node
+        best_move = None
+
+    return game_blunders
+
+def _game_blunders_single_search(engine, game, pgn_file, game_id, limit, resolver=None):
+    # Searches every mainline position at most once. The score after ply N
+    # is the score before ply N + 1, and the best move is the first move of
+    # the principal variation of the same search. Book moves are theory and
+    # skipped, and tablebase positions are resolved without the engine. The
+    # remaining positions are submitted to the engine as one batch.
+    board = game.board()
+    start = 0
+    boards = [board.copy()]
+    in_book = resolver is not None and resolver.book is not None
+    for move in game.mainline_moves():
+        in_book = in_book and move in resolver.book_moves(board)
+        if in_book:
+            start += 1
+        board.push(move)
+        boards.append(board.copy())
+
+    results = [None] * start + analyse_many(engine, boards[start:], chess.engine.Limit(depth=10), resolver)
+    return blunders_from_results(game, results, pgn_file, game_id, limit)
+
+def blunders_from_results(game, results, pgn_file, game_id, limit=150):
+    # Applies the single search rule to precomputed results, one for each
+    # mainline position including the last. Plies with a missing result on
+    # either side are skipped.
+    game_blunders = []
+    board = game.board()
+    ply = game.ply()
+    for i, move in enumerate(game.mainline_moves()):
+        before, after = results[i], results[i + 1]
+        if before is not None and after is not None and before.get("pv"):
+            best_move = before["pv"][0]
+            if abs(_relative_score(before) + _relative_score(after)) > limit:
+                game_blunders.append(_blunder_record(board, ply, move, best_move, pgn_file, game_id))
+        board.push(move)
+        ply += 1
+    return game_blunders
+
+def checkpointed(state, results):
+    # The game is recorded as done before its records are written, so the
+    # run state always has a complete copy of the results.
+    for shard, game_blunders in results:
+        state.complete(shard, game_blunders)
+        yield game_blunders
 
 if __name__ == "__main__":
     directory = 'test_data'
-    previous_files = set()  # load this from disk if you have it saved
-    new_pgn_files = process_new_files(previous_files, directory)
-    new_pgn_files = [os.path.join(directory, file) for file in new_pgn_files if file.endswith('.pgn')]
-
     stockfish_path = 'engines/stockfish'
     csv_dir = "csv"
     os.makedirs(csv_dir, exist_ok=True)
-
-    with multiprocessing.Pool() as pool:
-        results = pool.starmap(evaluate_game, [(pgn_file, stockfish_path) for pgn_file in new_pgn_files])
-
-    all_blunders = [blunder for result in results for blunder in result]
-    log_blunders(csv_dir, all_blunders)
\ No newline at end of file
+    cache_path = os.path.join(csv_dir, "analysis_cache.sqlite3")
+
+    # Only new files, games appended to known files and games left over
+    # from an interrupted run are analysed.
+    with RunState(os.path.join(csv_dir, "run_state.sqlite3")) as state:
+        pgn_files = [os.path.join(directory, file) for file in sorted(os.listdir(directory)) if file.endswith('.pgn')]
+
+        pending = state.pending_shards(pgn_files)
+        if not pending:
+            # Nothing to write, so do not leave an empty CSV file behind.
+            print("No new games to analyse.")
+        else:
+            # Dispatch single games rather than whole files, so that a large file
+            # is spread over all cores.
+            shards = [(shard, game_id, stockfish_path, 150, True, cache_path) for shard, game_id in pending]
+
+            with multiprocessing.Pool() as pool:
+                # Analyse each distinct position of the corpus exactly once. The
+                # blunder pass then reads every score from the analysis cache.
+                plan = plan_corpus(pool, [shard for shard, _ in pending])
+                print(f"Positions: {plan.total}, unique: {plan.unique}, dedup ratio: {plan.dedup_ratio:.2f}")
+                analyse_plan(pool, plan, stockfish_path, cache_path)
+
+                # Records are written as soon as each game finishes.
+                log_blunders(csv_dir, checkpointed(state, pool.imap_unordered(_evaluate_shard_star, shards)))
+                # Let the workers exit normally so that their engines are shut down.
+                pool.close()
+                pool.join()
@@ -0,0 +1,161 @@
+import csv
+import dataclasses
+import json
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Type
+
+
+@dataclass
+class BlunderRecord:
+    """A single blunder found by blunder_check."""
+    game_file: str = field(metadata={"width": 256})
+    game_id: int
+    move_type: str = field(metadata={"width": 4})
+    move_number: int
+    actual_move: str = field(metadata={"width": 16})
+    best_move: str = field(metadata={"width": 16})
+
+
+class BlunderWriter:
+    """
+    Base class for streaming record writers. Records are written as they
+    are produced and flushed after every batch, so partial output survives
+    a crash and nothing is held in memory.
+    """
+
+    def __init__(self, path, record_type: Type[Any] = BlunderRecord):
+        self.path = path
+        self.record_type = record_type
+        self.columns = [f.name for f in dataclasses.fields(record_type)]
+
+    def write(self, record) -> None:
+        raise NotImplementedError
+
+    def write_many(self, records) -> None:
+        for record in records:
+            self.write(record)
+        self.flush()
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CsvBlunderWriter(BlunderWriter):
+    def __init__(self, path, record_type: Type[Any] = BlunderRecord):
+        super().__init__(path, record_type)
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def write(self, record) -> None:
+        self._writer.writerow(dataclasses.astuple(record))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonLinesBlunderWriter(BlunderWriter):
+    def __init__(self, path, record_type: Type[Any] = BlunderRecord):
+        super().__init__(path, record_type)
+        self._file = open(path, 'w')
+
+    def write(self, record) -> None:
+        self._file.write(json.dumps(dataclasses.asdict(record)) + "\n")
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def column_dtypes(record_type: Type[Any] = BlunderRecord) -> Dict[str, str]:
+    """NumPy dtype string of each column written by ColumnarBlunderWriter."""
+    dtypes = {}
+    for f in dataclasses.fields(record_type):
+        if f.type is int:
+            dtypes[f.name] = "<i8"
+        elif f.type is float:
+            dtypes[f.name] = "<f8"
+        else:
+            dtypes[f.name] = f"S{f.metadata.get('width', 64)}"
+    return dtypes
+
+
+class ColumnarBlunderWriter(BlunderWriter):
+    """
+    Appends records to a directory with one fixed-width binary file per
+    column and a schema.json with the NumPy dtype of each column. Use
+    read_columns() or np.fromfile(os.path.join(path, name), dtype) to load
+    them. Strings longer than their column width are truncated.
+    """
+
+    def __init__(self, path, record_type: Type[Any] = BlunderRecord):
+        super().__init__(path, record_type)
+        self.dtypes = column_dtypes(record_type)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "schema.json"), 'w') as schema:
+            json.dump(self.dtypes, schema)
+        self._files = {name: open(os.path.join(path, name), 'ab') for name in self.columns}
+
+    def write(self, record) -> None:
+        for name in self.columns:
+            value = getattr(record, name)
+            dtype = self.dtypes[name]
+            if dtype == "<i8":
+                data = int(value).to_bytes(8, "little", signed=True)
+            elif dtype == "<f8":
+                data = struct.pack("<d", value)
+            else:
+                width = int(dtype[1:])
+                data = str(value).encode("utf-8")[:width].ljust(width, b"\0")
+            self._files[name].write(data)
+
+    def flush(self) -> None:
+        for f in self._files.values():
+            f.flush()
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+
+def read_columns(path) -> Dict[str, Any]:
+    """Loads a directory written by ColumnarBlunderWriter as NumPy arrays."""
+    import numpy as np
+
+    with open(os.path.join(path, "schema.json")) as schema:
+        dtypes = json.load(schema)
+    return {name: np.fromfile(os.path.join(path, name), dtype=dtype) for name, dtype in dtypes.items()}
+
+
+WRITERS: Dict[str, Type[BlunderWriter]] = {
+    "csv": CsvBlunderWriter,
+    "jsonl": JsonLinesBlunderWriter,
+    "columnar": ColumnarBlunderWriter,
+}
+
+
+def open_writer(path, format: Optional[str] = None, record_type: Type[Any] = BlunderRecord) -> BlunderWriter:
+    """
+    Opens a streaming writer. The format is one of WRITERS and defaults to
+    the file extension of *path* (.csv, .jsonl, otherwise columnar).
+    """
+    if format is None:
+        extension = os.path.splitext(path)[1].lstrip(".")
+        format = extension if extension in WRITERS else "columnar"
+    return WRITERS[format](path, record_type)
@@ -29,8 +29,6 @@ __email__ = "niklas.fiekas@backscattering.de"
 
 __version__ = "1.9.4"
 
-import collections
-import copy
 import dataclasses
 import enum
 import math
@@ -38,7 +36,7 @@ import re
 import itertools
 import typing
 
-from typing import ClassVar, Callable, Counter, Dict, Generic, Hashable, Iterable, Iterator, List, Mapping, Optional, SupportsInt, Tuple, Type, TypeVar, Union
+from typing import ClassVar, Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Mapping, Optional, SupportsInt, Tuple, Type, TypeVar, Union
 
 try:
     from typing import Literal
@@ -431,20 +429,24 @@ def _carry_rippler(mask: Bitboard) -> Iterator[Bitboard]:
         if not subset:
             break
 
-def _attack_table(deltas: List[int]) -> Tuple[List[Bitboard], List[Dict[Bitboard, Bitboard]]]:
-    mask_table = []
-    attack_table = []
-
-    for square in SQUARES:
-        attacks = {}
+class _SlidingAttacks(Dict[Bitboard, Bitboard]):
+    # Attacks of a slider on one square, keyed by the blockers on its mask.
+    # Entries are computed the first time a blocker subset is looked up, so
+    # that importing the module does not enumerate every subset up front.
+    __slots__ = ("square", "deltas")
 
-        mask = _sliding_attacks(square, 0, deltas) & ~_edges(square)
-        for subset in _carry_rippler(mask):
-            attacks[subset] = _sliding_attacks(square, subset, deltas)
+    def __init__(self, square: Square, deltas: List[int]) -> None:
+        super().__init__()
+        self.square = square
+        self.deltas = deltas
 
-        attack_table.append(attacks)
-        mask_table.append(mask)
+    def __missing__(self, subset: Bitboard) -> Bitboard:
+        attacks = self[subset] = _sliding_attacks(self.square, subset, self.deltas)
+        return attacks
 
+def _attack_table(deltas: List[int]) -> Tuple[List[Bitboard], List[Dict[Bitboard, Bitboard]]]:
+    mask_table = [_sliding_attacks(square, 0, deltas) & ~_edges(square) for square in SQUARES]
+    attack_table: List[Dict[Bitboard, Bitboard]] = [_SlidingAttacks(square, deltas) for square in SQUARES]
     return mask_table, attack_table
 
 BB_DIAG_MASKS, BB_DIAG_ATTACKS = _attack_table([-9, -7, 7, 9])
@@ -664,6 +666,8 @@ class BaseBoard:
         self.occupied_co[BLACK] = BB_RANK_7 | BB_RANK_8
         self.occupied = BB_RANK_1 | BB_RANK_2 | BB_RANK_7 | BB_RANK_8
 
+        self._zobrist_pieces = _ZOBRIST_STARTING_PIECES
+
     def reset_board(self) -> None:
         """
         Resets pieces to the starting position.
@@ -688,6 +692,8 @@ class BaseBoard:
         self.occupied_co[BLACK] = BB_EMPTY
         self.occupied = BB_EMPTY
 
+        self._zobrist_pieces = 0
+
     def clear_board(self) -> None:
         """
         Clears the board.
@@ -898,6 +904,15 @@ class BaseBoard:
         """
         return self.pin_mask(color, square) != BB_ALL
 
+    def _rehash_pieces(self) -> None:
+        # Recomputes the piece part of the Zobrist key after the bitboards
+        # have been set directly.
+        zobrist_pieces = 0
+        for color in COLORS:
+            for square in scan_reversed(self.occupied_co[color]):
+                zobrist_pieces ^= _ZOBRIST_PIECES[typing.cast(PieceType, self.piece_type_at(square))][color][square]
+        self._zobrist_pieces = zobrist_pieces
+
     def _remove_piece_at(self, square: Square) -> Optional[PieceType]:
         piece_type = self.piece_type_at(square)
         mask = BB_SQUARES[square]
@@ -917,6 +932,8 @@ class BaseBoard:
         else:
             return None
 
+        self._zobrist_pieces ^= _ZOBRIST_PIECES[piece_type][bool(self.occupied_co[WHITE] & mask)][square]
+
         self.occupied ^= mask
         self.occupied_co[WHITE] &= ~mask
         self.occupied_co[BLACK] &= ~mask
@@ -956,6 +973,8 @@ class BaseBoard:
         else:
             return
 
+        self._zobrist_pieces ^= _ZOBRIST_PIECES[piece_type][color][square]
+
         self.occupied ^= mask
         self.occupied_co[color] ^= mask
 
@@ -1155,6 +1174,7 @@ class BaseBoard:
         self.occupied_co[BLACK] = BB_RANK_7 | BB_RANK_8
         self.occupied = BB_RANK_1 | BB_RANK_2 | BB_RANK_7 | BB_RANK_8
         self.promoted = BB_EMPTY
+        self._rehash_pieces()
 
     def set_chess960_pos(self, scharnagl: int) -> None:
         """
@@ -1341,6 +1361,7 @@ class BaseBoard:
         self.occupied_co[BLACK] = f(self.occupied_co[BLACK])
         self.occupied = f(self.occupied)
         self.promoted = f(self.promoted)
+        self._rehash_pieces()
 
     def transform(self: BaseBoardT, f: Callable[[Bitboard], Bitboard]) -> BaseBoardT:
         """
@@ -1363,6 +1384,7 @@ class BaseBoard:
     def apply_mirror(self: BaseBoardT) -> None:
         self.apply_transform(flip_vertical)
         self.occupied_co[WHITE], self.occupied_co[BLACK] = self.occupied_co[BLACK], self.occupied_co[WHITE]
+        self._rehash_pieces()
 
     def mirror(self: BaseBoardT) -> BaseBoardT:
         """
@@ -1393,6 +1415,7 @@ class BaseBoard:
         board.occupied_co[BLACK] = self.occupied_co[BLACK]
         board.occupied = self.occupied
         board.promoted = self.promoted
+        board._zobrist_pieces = self._zobrist_pieces
 
         return board
 
@@ -1431,6 +1454,10 @@ BoardT = TypeVar("BoardT", bound="Board")
 
 class _BoardState(Generic[BoardT]):
 
+    __slots__ = ("pawns", "knights", "bishops", "rooks", "queens", "kings",
+                 "occupied_w", "occupied_b", "occupied", "promoted", "zobrist_pieces",
+                 "turn", "castling_rights", "ep_square", "halfmove_clock", "fullmove_number")
+
     def __init__(self, board: BoardT) -> None:
         self.pawns = board.pawns
         self.knights = board.knights
@@ -1444,6 +1471,7 @@ class _BoardState(Generic[BoardT]):
         self.occupied = board.occupied
 
         self.promoted = board.promoted
+        self.zobrist_pieces = board._zobrist_pieces
 
         self.turn = board.turn
         self.castling_rights = board.castling_rights
@@ -1464,6 +1492,7 @@ class _BoardState(Generic[BoardT]):
         board.occupied = self.occupied
 
         board.promoted = self.promoted
+        board._zobrist_pieces = self.zobrist_pieces
 
         board.turn = self.turn
         board.castling_rights = self.castling_rights
@@ -1471,6 +1500,68 @@ class _BoardState(Generic[BoardT]):
         board.halfmove_clock = self.halfmove_clock
         board.fullmove_number = self.fullmove_number
 
+class _BoardDelta:
+    # Undoes a single move by reversing what it changed, instead of
+    # restoring a snapshot of the entire board. The moved and captured
+    # pieces are filled in by Board._push_delta().
+
+    __slots__ = ("move", "piece_type", "captured", "capture_square", "castling",
+                 "promoted", "zobrist_pieces", "castling_rights", "ep_square", "halfmove_clock", "fullmove_number")
+
+    def __init__(self, board: Board, move: Move) -> None:
+        self.move = move
+        self.piece_type = KING
+        self.captured: Optional[PieceType] = None
+        self.capture_square = move.to_square
+        self.castling = False
+
+        self.promoted = board.promoted
+        self.zobrist_pieces = board._zobrist_pieces
+        self.castling_rights = board.castling_rights
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+
+    def restore(self, board: Board) -> None:
+        move = self.move
+        color = not board.turn
+
+        if self.castling:
+            a_side = square_file(move.to_square) < square_file(move.from_square)
+            board._remove_piece_at((C1 if a_side else G1) if color == WHITE else (C8 if a_side else G8))
+            board._remove_piece_at((D1 if a_side else F1) if color == WHITE else (D8 if a_side else F8))
+            board._set_piece_at(move.from_square, KING, color)
+            board._set_piece_at(move.to_square, ROOK, color)
+        else:
+            from_bb = BB_SQUARES[move.from_square]
+            to_bb = BB_SQUARES[move.to_square]
+            if move.promotion:
+                board.pawns |= from_bb
+                name = _PIECE_BITBOARDS[move.promotion]
+                setattr(board, name, getattr(board, name) ^ to_bb)
+            else:
+                name = _PIECE_BITBOARDS[self.piece_type]
+                setattr(board, name, getattr(board, name) ^ from_bb ^ to_bb)
+            board.occupied_co[color] ^= from_bb | to_bb
+
+            if self.captured:
+                capture_bb = BB_SQUARES[self.capture_square]
+                name = _PIECE_BITBOARDS[self.captured]
+                setattr(board, name, getattr(board, name) | capture_bb)
+                board.occupied_co[not color] |= capture_bb
+
+            board.occupied = board.occupied_co[WHITE] | board.occupied_co[BLACK]
+
+        board.promoted = self.promoted
+        board._zobrist_pieces = self.zobrist_pieces
+        board.turn = color
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+
+_PIECE_BITBOARDS = ["", "pawns", "knights", "bishops", "rooks", "queens", "kings"]
+
 class Board(BaseBoard):
     """
     A :class:`~chess.BaseBoard`, additional information representing
@@ -1588,7 +1679,8 @@ class Board(BaseBoard):
 
         self.ep_square = None
         self.move_stack = []
-        self._stack: List[_BoardState[BoardT]] = []
+        self._stack: List[Union[_BoardState[BoardT], _BoardDelta]] = []
+        self._repetition_keys: Optional[List[Hashable]] = None
 
         if fen is None:
             self.clear()
@@ -1672,16 +1764,30 @@ class Board(BaseBoard):
         """Clears the move stack."""
         self.move_stack.clear()
         self._stack.clear()
+        self._repetition_keys = None
 
     def root(self: BoardT) -> BoardT:
         """Returns a copy of the root position."""
         if self._stack:
-            board = type(self)(None, chess960=self.chess960)
-            self._stack[0].restore(board)
-            return board
+            return self._ancestor(0)
         else:
             return self.copy(stack=False)
 
+    def _ancestor(self: BoardT, index: int) -> BoardT:
+        # Copy of the position before the move at *index* of the move stack,
+        # without move stack.
+        state = self._stack[index]
+        if isinstance(state, _BoardState):
+            board = type(self)(None, chess960=self.chess960)
+            state.restore(board)
+            return board
+
+        board = self.copy(stack=len(self._stack) - index)
+        while board._stack:
+            board._stack.pop().restore(board)
+        board.move_stack.clear()
+        return board
+
     def ply(self) -> int:
         """
         Returns the number of half-moves since the start of the game, as
@@ -1943,8 +2049,7 @@ class Board(BaseBoard):
         The game is not considered to be over by the
         :func:`fifty-move rule <chess.Board.can_claim_fifty_moves()>` or
         :func:`threefold repetition <chess.Board.can_claim_threefold_repetition()>`,
-        unless *claim_draw* is given. Note that checking the latter can be
-        slow.
+        unless *claim_draw* is given.
         """
         # Variant support.
         if self.is_variant_loss():
@@ -2061,8 +2166,6 @@ class Board(BaseBoard):
         """
         Checks if the player to move can claim a draw by the fifty-move rule or
         by threefold repetition.
-
-        Note that checking the latter can be slow.
         """
         return self.can_claim_fifty_moves() or self.can_claim_threefold_repetition()
 
@@ -2104,38 +2207,23 @@ class Board(BaseBoard):
         Draw by threefold repetition can be claimed if the position on the
         board occurred for the third time or if such a repetition is reached
         with one of the possible legal moves.
-
-        Note that checking this can be slow: In the worst case
-        scenario, every legal move has to be tested and the entire game has to
-        be replayed because there is no incremental transposition table.
         """
-        transposition_key = self._transposition_key()
-        transpositions: Counter[Hashable] = collections.Counter()
-        transpositions.update((transposition_key, ))
-
-        # Count positions.
-        switchyard = []
-        while self.move_stack:
-            move = self.pop()
-            switchyard.append(move)
-
-            if self.is_irreversible(move):
-                break
-
-            transpositions.update((self._transposition_key(), ))
-
-        while switchyard:
-            self.push(switchyard.pop())
-
         # Threefold repetition occurred.
-        if transpositions[transposition_key] >= 3:
+        if self._repetition_count() >= 3:
             return True
 
-        # The next legal move is a threefold repetition.
+        # The next legal move is a threefold repetition. This requires a
+        # position that already occurred twice, counting the current one.
+        assert self._repetition_keys is not None
+        keys = self._repetition_window(self._repetition_keys)
+        keys.append(self._repetition_key())
+        if len(set(keys)) == len(keys):
+            return False
+
         for move in self.generate_legal_moves():
             self.push(move)
             try:
-                if transpositions[self._transposition_key()] >= 2:
+                if self._repetition_count() >= 3:
                     return True
             finally:
                 self.pop()
@@ -2150,46 +2238,76 @@ class Board(BaseBoard):
         Unlike :func:`~chess.Board.can_claim_threefold_repetition()`,
         this does not consider a repetition that can be played on the next
         move.
+        """
+        return self._repetition_count() >= count
+
+    _clock_repetitions: ClassVar[bool] = True
+    # Whether the positions since the last irreversible move are exactly
+    # those counted by the halfmove clock, and can be compared by their
+    # incremental Zobrist key. Variants that keep additional state or
+    # define irreversible moves differently compare transposition keys.
+
+    def _repetition_count(self) -> int:
+        # How often the current position occurred since the last irreversible
+        # move. The first call replays the moves back to that point, so that
+        # push() records the key of each position, and later calls compare
+        # against the keys kept up to date by push() and pop().
+        keys = self._repetition_keys
+        if keys is None:
+            switchyard = []
+            if self._clock_repetitions:
+                for _ in range(min(self.halfmove_clock, len(self.move_stack))):
+                    switchyard.append(self.pop())
+            else:
+                while self.move_stack:
+                    move = self.pop()
+                    switchyard.append(move)
+                    if self.is_irreversible(move):
+                        break
 
-        Note that checking this can be slow: In the worst case, the entire
-        game has to be replayed because there is no incremental transposition
-        table.
-        """
-        # Fast check, based on occupancy only.
-        maybe_repetitions = 1
-        for state in reversed(self._stack):
-            if state.occupied == self.occupied:
-                maybe_repetitions += 1
-                if maybe_repetitions >= count:
-                    break
-        if maybe_repetitions < count:
-            return False
-
-        # Check full replay.
-        transposition_key = self._transposition_key()
-        switchyard = []
-
-        try:
-            while True:
-                if count <= 1:
-                    return True
-
-                if len(self.move_stack) < count - 1:
-                    break
-
-                move = self.pop()
-                switchyard.append(move)
-
-                if self.is_irreversible(move):
-                    break
-
-                if self._transposition_key() == transposition_key:
-                    count -= 1
-        finally:
+            keys = self._repetition_keys = []
             while switchyard:
                 self.push(switchyard.pop())
 
-        return False
+        window = self._repetition_window(keys)
+        return window.count(self._repetition_key()) + 1 if window else 1
+
+    def _repetition_window(self, keys: List[Hashable]) -> List[Hashable]:
+        if self._clock_repetitions:
+            return keys[len(keys) - min(self.halfmove_clock, len(keys)):]
+        for i in range(len(keys) - 1, -1, -1):
+            if keys[i] is None:
+                return keys[i + 1:]
+        return keys[:]
+
+    def _repetition_key(self) -> Hashable:
+        if not self._clock_repetitions:
+            return self._transposition_key()
+
+        # Castling rights are clean after every move, and the en passant
+        # square counts only if the capture is legal, like in the
+        # transposition key. It is set only right after a double step.
+        # Counting is suspended while legality is checked, because some
+        # variants push moves to do so.
+        ep_square = self.ep_square
+        if ep_square is not None:
+            keys, self._repetition_keys = self._repetition_keys, None
+            try:
+                if not self.has_legal_en_passant():
+                    ep_square = None
+            finally:
+                self._repetition_keys = keys
+        return (self._zobrist_pieces, self.turn, self.castling_rights if self._stack else self.clean_castling_rights(), ep_square)
+
+    def _repetition_entry(self, move: Move) -> Hashable:
+        # The key of the position before a move, or None if the move is
+        # irreversible. Counting is suspended meanwhile, because some
+        # variants push moves to decide if a move is irreversible.
+        keys, self._repetition_keys = self._repetition_keys, None
+        try:
+            return None if self.is_irreversible(move) else self._transposition_key()
+        finally:
+            self._repetition_keys = keys
 
     def _board_state(self: BoardT) -> _BoardState[BoardT]:
         return _BoardState(self)
@@ -2197,6 +2315,16 @@ class Board(BaseBoard):
     def _push_capture(self, move: Move, capture_square: Square, piece_type: PieceType, was_promoted: bool) -> None:
         pass
 
+    _delta_undo: ClassVar[bool] = True
+    # Whether moves can be undone by reversing their changes. Subclasses
+    # that keep additional state or change more of the board with a move
+    # store snapshots.
+
+    def __init_subclass__(cls, **kwargs: object) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._delta_undo = all(getattr(cls, name) is getattr(Board, name) for name in ["_board_state", "_push_capture", "is_zeroing", "_set_piece_at", "_remove_piece_at"])
+        cls._clock_repetitions = all(getattr(cls, name) is getattr(Board, name) for name in ["_board_state", "is_irreversible", "is_zeroing", "_transposition_key"])
+
     def push(self: BoardT, move: Move) -> None:
         """
         Updates the position with the given *move* and puts it onto the
@@ -2221,10 +2349,30 @@ class Board(BaseBoard):
             a null move.
         """
         # Push move and remember board state.
-        move = self._to_chess960(move)
+        chess960_move = self._to_chess960(move)
+        if chess960_move is not move:
+            stack_move = chess960_move if self.chess960 else move
+        elif self.chess960 or self.kings & BB_SQUARES[move.from_square]:
+            stack_move = self._from_chess960(self.chess960, move.from_square, move.to_square, move.promotion, move.drop)
+        else:
+            stack_move = move
+        move = chess960_move
+
+        keys = self._repetition_keys
+        if keys is not None:
+            keys.append(self._repetition_key() if self._clock_repetitions else self._repetition_entry(move))
+
+        # Standard boards record only what the move changes, except for the
+        # first move, so that the root position can always be restored
+        # directly.
+        if self._delta_undo and not self.chess960 and self._stack and move and not move.drop:
+            self.move_stack.append(stack_move)
+            self._push_delta(move)
+            return
+
         board_state = self._board_state()
         self.castling_rights = self.clean_castling_rights()  # Before pushing stack
-        self.move_stack.append(self._from_chess960(self.chess960, move.from_square, move.to_square, move.promotion, move.drop))
+        self.move_stack.append(stack_move)
         self._stack.append(board_state)
 
         # Reset en passant square.
@@ -2318,6 +2466,116 @@ class Board(BaseBoard):
         # Swap turn.
         self.turn = not self.turn
 
+    def _push_delta(self, move: Move) -> None:
+        # push() of a normal move on a standard board, with the pieces moved
+        # directly on the bitboards.
+        turn = self.turn
+        from_square = move.from_square
+        to_square = move.to_square
+        from_bb = BB_SQUARES[from_square]
+        to_bb = BB_SQUARES[to_square]
+
+        piece_type = self.piece_type_at(from_square)
+        assert piece_type is not None, f"push() expects move to be pseudo-legal, but got {move} in {self.board_fen()}"
+        captured_piece_type = self.piece_type_at(to_square)
+        capture_square = to_square
+        promoted = self.promoted & from_bb
+
+        board_state = _BoardDelta(self, move)
+        board_state.piece_type = piece_type
+        self._stack.append(board_state)
+
+        # Reset en passant square.
+        ep_square = self.ep_square
+        self.ep_square = None
+
+        # Update move counters.
+        touched = from_bb ^ to_bb
+        if touched & self.pawns or touched & self.occupied_co[not turn]:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if turn == BLACK:
+            self.fullmove_number += 1
+
+        # Update castling rights.
+        self.castling_rights &= ~to_bb & ~from_bb
+        if piece_type == KING and not promoted:
+            if turn == WHITE:
+                self.castling_rights &= ~BB_RANK_1
+            else:
+                self.castling_rights &= ~BB_RANK_8
+        elif captured_piece_type == KING and not self.promoted & to_bb:
+            if turn == WHITE and square_rank(to_square) == 7:
+                self.castling_rights &= ~BB_RANK_8
+            elif turn == BLACK and square_rank(to_square) == 0:
+                self.castling_rights &= ~BB_RANK_1
+
+        # Castling.
+        if piece_type == KING and self.occupied_co[turn] & to_bb:
+            board_state.castling = True
+            a_side = square_file(to_square) < square_file(from_square)
+
+            self._remove_piece_at(from_square)
+            self._remove_piece_at(to_square)
+
+            if a_side:
+                self._set_piece_at(C1 if turn == WHITE else C8, KING, turn)
+                self._set_piece_at(D1 if turn == WHITE else D8, ROOK, turn)
+            else:
+                self._set_piece_at(G1 if turn == WHITE else G8, KING, turn)
+                self._set_piece_at(F1 if turn == WHITE else F8, ROOK, turn)
+
+            self.turn = not turn
+            return
+
+        # Handle special pawn moves.
+        if piece_type == PAWN:
+            diff = to_square - from_square
+
+            if diff == 16 and square_rank(from_square) == 1:
+                self.ep_square = from_square + 8
+            elif diff == -16 and square_rank(from_square) == 6:
+                self.ep_square = from_square - 8
+            elif to_square == ep_square and abs(diff) in [7, 9] and not captured_piece_type:
+                # Capture en passant.
+                capture_square = ep_square + (-8 if turn == WHITE else 8)
+                captured_piece_type = PAWN
+
+        # Remove the captured piece.
+        zobrist_pieces = self._zobrist_pieces
+        vacated = from_bb
+        if captured_piece_type:
+            board_state.captured = captured_piece_type
+            board_state.capture_square = capture_square
+            capture_bb = BB_SQUARES[capture_square]
+            name = _PIECE_BITBOARDS[captured_piece_type]
+            setattr(self, name, getattr(self, name) ^ capture_bb)
+            self.occupied_co[not turn] ^= capture_bb
+            zobrist_pieces ^= _ZOBRIST_PIECES[captured_piece_type][not turn][capture_square]
+            vacated |= capture_bb
+
+        # Move the piece, promoting it if necessary.
+        if move.promotion:
+            self.pawns ^= from_bb
+            name = _PIECE_BITBOARDS[move.promotion]
+            setattr(self, name, getattr(self, name) | to_bb)
+            zobrist_pieces ^= _ZOBRIST_PIECES[PAWN][turn][from_square] ^ _ZOBRIST_PIECES[move.promotion][turn][to_square]
+            promoted = to_bb
+        else:
+            name = _PIECE_BITBOARDS[piece_type]
+            setattr(self, name, getattr(self, name) ^ from_bb | to_bb)
+            zobrist_pieces ^= _ZOBRIST_PIECES[piece_type][turn][from_square] ^ _ZOBRIST_PIECES[piece_type][turn][to_square]
+            promoted = to_bb if promoted else BB_EMPTY
+
+        self.occupied_co[turn] ^= from_bb | to_bb
+        self.occupied = self.occupied_co[WHITE] | self.occupied_co[BLACK]
+        self.promoted = self.promoted & ~(vacated | to_bb) | promoted
+        self._zobrist_pieces = zobrist_pieces
+
+        # Swap turn.
+        self.turn = not turn
+
     def pop(self: BoardT) -> Move:
         """
         Restores the previous position and returns the last move from the stack.
@@ -2326,6 +2584,13 @@ class Board(BaseBoard):
         """
         move = self.move_stack.pop()
         self._stack.pop().restore(self)
+        keys = self._repetition_keys
+        if keys is not None:
+            if keys:
+                keys.pop()
+            else:
+                # Popped past the position where counting started.
+                self._repetition_keys = None
         return move
 
     def peek(self) -> Move:
@@ -3674,6 +3939,44 @@ class Board(BaseBoard):
 
         return move
 
+    @property
+    def zobrist_key(self) -> int:
+        """
+        The Polyglot Zobrist hash of the position, equal to
+        :func:`chess.polyglot.zobrist_hash()`.
+
+        The piece placement is hashed incrementally as pieces are set and
+        removed, so only castling rights, the en passant file and the turn
+        are added when the key is requested. Variant state beyond these,
+        like Crazyhouse pockets or remaining checks, is not part of the key.
+        """
+        key = self._zobrist_pieces
+
+        if self.castling_rights:
+            if self.has_kingside_castling_rights(WHITE):
+                key ^= _ZOBRIST_CASTLING[0]
+            if self.has_queenside_castling_rights(WHITE):
+                key ^= _ZOBRIST_CASTLING[1]
+            if self.has_kingside_castling_rights(BLACK):
+                key ^= _ZOBRIST_CASTLING[2]
+            if self.has_queenside_castling_rights(BLACK):
+                key ^= _ZOBRIST_CASTLING[3]
+
+        # Like Polyglot, hash the en passant file only if a pawn is ready to
+        # capture, regardless of the legality of the capture.
+        if self.ep_square:
+            if self.turn == WHITE:
+                ep_mask = shift_down(BB_SQUARES[self.ep_square])
+            else:
+                ep_mask = shift_up(BB_SQUARES[self.ep_square])
+            if (shift_left(ep_mask) | shift_right(ep_mask)) & self.pawns & self.occupied_co[self.turn]:
+                key ^= _ZOBRIST_EN_PASSANT[square_file(self.ep_square)]
+
+        if self.turn == WHITE:
+            key ^= _ZOBRIST_TURN
+
+        return key
+
     def _transposition_key(self) -> Hashable:
         return (self.pawns, self.knights, self.bishops, self.rooks,
                 self.queens, self.kings,
@@ -3741,6 +4044,10 @@ class Board(BaseBoard):
 
         Defaults to copying the entire move stack. Alternatively, *stack* can
         be ``False``, or an integer to copy a limited number of moves.
+
+        Moves and the states recorded for them are immutable, so only the
+        lists are copied, not their entries. The original board keeps its
+        own lists and is not slowed down by the copy.
         """
         board = super().copy()
 
@@ -3752,9 +4059,11 @@ class Board(BaseBoard):
         board.fullmove_number = self.fullmove_number
         board.halfmove_clock = self.halfmove_clock
 
-        if stack:
-            stack = len(self.move_stack) if stack is True else stack
-            board.move_stack = [copy.copy(move) for move in self.move_stack[-stack:]]
+        if stack is True:
+            board.move_stack = self.move_stack[:]
+            board._stack = self._stack[:]
+        elif stack:
+            board.move_stack = self.move_stack[-stack:]
             board._stack = self._stack[-stack:]
 
         return board
@@ -4183,3 +4492,20 @@ class SquareSet:
         True
         """
         return cls(BB_SQUARES[square])
+
+
+# The Polyglot random array lives in chess.polyglot, which itself imports
+# this module, so it is only imported once everything above is defined.
+from chess.polyglot import POLYGLOT_RANDOM_ARRAY as _POLYGLOT_RANDOM_ARRAY
+
+_ZOBRIST_PIECES = [[]] + [
+    [_POLYGLOT_RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + color):64 * ((piece_type - 1) * 2 + color + 1)] for color in [BLACK, WHITE]]
+    for piece_type in PIECE_TYPES]
+_ZOBRIST_CASTLING = _POLYGLOT_RANDOM_ARRAY[768:772]
+_ZOBRIST_EN_PASSANT = _POLYGLOT_RANDOM_ARRAY[772:780]
+_ZOBRIST_TURN = _POLYGLOT_RANDOM_ARRAY[780]
+
+_starting_board = BaseBoard(None)
+_starting_board._set_board_fen(STARTING_BOARD_FEN)
+_ZOBRIST_STARTING_PIECES = _starting_board._zobrist_pieces
+del _starting_board
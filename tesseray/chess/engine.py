@@ -24,6 +24,7 @@ import contextlib
 import copy
 import dataclasses
 import enum
+import json
 import logging
 import math
 import warnings
@@ -34,13 +35,17 @@ import threading
 import time
 import typing
 import os
+import queue
 import re
+import sqlite3
 
 import chess
+import chess.polyglot
+import chess.telemetry
 
 from chess import Color
 from types import TracebackType
-from typing import Any, Callable, Coroutine, Deque, Dict, Generator, Generic, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple, Type, TypeVar, Union
+from typing import Any, AsyncIterator, Callable, Coroutine, Deque, Dict, Generator, Generic, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple, Type, TypeVar, Union
 
 try:
     from typing import Literal
@@ -438,6 +443,30 @@ INFO_CURRLINE = Info.CURRLINE
 INFO_ALL = Info.ALL
 
 
+class Stream(enum.Enum):
+    """
+    How an :class:`~chess.engine.AnalysisResult` queues information for a
+    consumer that reads it slower than the engine sends it.
+    """
+
+    UNBOUNDED = enum.auto()
+    """Queue all information. Memory grows until it is consumed."""
+
+    BOUNDED = enum.auto()
+    """
+    Stop reading from the engine while *maxsize* items are pending, so
+    that the engine blocks on its output until the consumer catches up.
+    Lines that were already read from the pipe are still queued, so the
+    bound is exceeded by at most one read buffer.
+    """
+
+    LATEST = enum.auto()
+    """
+    Keep at most one pending item per root move. New information is merged
+    into the pending item, so the consumer reads only the freshest values.
+    """
+
+
 @dataclasses.dataclass
 class Opponent:
     """Used to store information about an engine's opponent."""
@@ -950,8 +979,8 @@ class MockTransport(asyncio.SubprocessTransport, asyncio.WriteTransport):
         assert not self.expectations, f"pending expectations: {self.expectations}"
 
     def get_pipe_transport(self, fd: int) -> Optional[asyncio.BaseTransport]:
-        assert fd == 0, f"expected 0 for stdin, got {fd}"
-        return self
+        assert fd in [0, 1], f"expected 0 for stdin or 1 for stdout, got {fd}"
+        return self if fd == 0 else None
 
     def write(self, data: bytes) -> None:
         self.stdin_buffer.extend(data)
@@ -976,6 +1005,142 @@ class MockTransport(asyncio.SubprocessTransport, asyncio.WriteTransport):
         return None if self.expectations else 0
 
 
+class SessionRecorder:
+    """
+    Records the lines exchanged with an engine, and when they were sent or
+    received, to a file that :class:`~chess.engine.ReplayTransport` can
+    serve back without the engine.
+
+    The file has one JSON object per line. The first one describes the
+    session, each further one is an event with the time in seconds since
+    the start of the recording and either the line sent to the engine
+    (``"send"``) or the line received from it (``"recv"``).
+    """
+
+    def __init__(self, path: str, *, protocol: str = "UciProtocol", command: Union[str, List[str], None] = None) -> None:
+        self.path = path
+        # Line buffered, so that the recording is complete as soon as a line
+        # was exchanged, even before the engine process is reaped.
+        self._file = open(path, "w", buffering=1)
+        self._start = time.perf_counter()
+        self._file.write(json.dumps({"protocol": protocol, "command": command}) + "\n")
+
+    def _event(self, direction: str, line: str) -> None:
+        if not self._file.closed:
+            self._file.write(json.dumps({"t": round(time.perf_counter() - self._start, 6), direction: line}) + "\n")
+
+    def sent(self, line: str) -> None:
+        self._event("send", line)
+
+    def received(self, line: str) -> None:
+        self._event("recv", line)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ReplayTransport(asyncio.SubprocessTransport, asyncio.WriteTransport):
+    """
+    Serves a session recorded by :class:`~chess.engine.SessionRecorder` in
+    place of the engine process.
+
+    Every line the protocol sends is matched against the next line that was
+    sent in the recording, and answered with the lines the engine sent
+    after it. Lines are answered at full speed, or with their original
+    delays if *timing* is enabled.
+
+    :param strict: Require sent lines to match the recording exactly.
+        Otherwise only the command (the first word) has to match, for
+        example to replay a session after the encoding of positions
+        changed. The recorded answers must still be valid for the
+        positions that are sent, otherwise the command fails with
+        :class:`~chess.engine.EngineError`.
+    """
+
+    def __init__(self, protocol: Protocol, path: str, *, timing: bool = False, strict: bool = True) -> None:
+        super().__init__()
+        self.protocol = protocol
+        self.path = path
+        self.timing = timing
+        self.strict = strict
+        self.stdin_buffer = bytearray()
+        self.returncode: Optional[int] = None
+
+        # Group the received lines by the sent line they follow.
+        self.exchanges: Deque[Tuple[Optional[str], List[Tuple[float, str]]]] = collections.deque()
+        sent_at = 0.0
+        with open(path) as f:
+            self.header = json.loads(f.readline())
+            self.exchanges.append((None, []))
+            for line in f:
+                event = json.loads(line)
+                if "send" in event:
+                    sent_at = event["t"]
+                    self.exchanges.append((event["send"], []))
+                else:
+                    self.exchanges[-1][1].append((event["t"] - sent_at, event["recv"]))
+
+        self.protocol.connection_made(self)
+        self._respond(self.exchanges.popleft()[1])
+
+    def _respond(self, responses: List[Tuple[float, str]]) -> None:
+        loop = self.protocol.loop
+        if not self.timing:
+            if responses:
+                data = "".join(line + "\n" for _, line in responses).encode("utf-8")
+                loop.call_soon(self._receive, data)
+            return
+
+        for delay, line in responses:
+            loop.call_later(delay, self._receive, (line + "\n").encode("utf-8"))
+
+    def _receive(self, data: bytes) -> None:
+        if self.returncode is None:
+            self.protocol.pipe_data_received(1, data)
+
+    def get_pipe_transport(self, fd: int) -> Optional[asyncio.BaseTransport]:
+        assert fd in [0, 1], f"expected 0 for stdin or 1 for stdout, got {fd}"
+        return self if fd == 0 else None
+
+    def write(self, data: bytes) -> None:
+        self.stdin_buffer.extend(data)
+        while b"\n" in self.stdin_buffer:
+            line_bytes, self.stdin_buffer = self.stdin_buffer.split(b"\n", 1)
+            line = line_bytes.decode("utf-8")
+
+            if not self.exchanges:
+                if line != "quit":
+                    LOGGER.error("%s: Recording exhausted, but got: %r", self.protocol, line)
+                self._exit(0)
+                return
+
+            expected, responses = self.exchanges.popleft()
+            assert expected is not None
+            if line != expected and (self.strict or line.split(" ", 1)[0] != expected.split(" ", 1)[0]):
+                raise EngineError(f"replay of {self.path!r} expected {expected!r}, got: {line!r}")
+            self._respond(responses)
+            if line == "quit" and not self.exchanges:
+                self._exit(0)
+
+    def _exit(self, returncode: int) -> None:
+        if self.returncode is None:
+            self.returncode = returncode
+            self.protocol.loop.call_soon(self.protocol.process_exited)
+            self.protocol.loop.call_soon(self.protocol.connection_lost, None)
+
+    def close(self) -> None:
+        self._exit(-9)
+
+    def is_closing(self) -> bool:
+        return self.returncode is not None
+
+    def get_pid(self) -> int:
+        return id(self)
+
+    def get_returncode(self) -> Optional[int]:
+        return self.returncode
+
+
 class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
     """Protocol for communicating with a chess engine process."""
 
@@ -1006,6 +1171,18 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
         self.initialized = False
         self.returncode: asyncio.Future[int] = asyncio.Future()
 
+        self.telemetry: Optional[chess.telemetry.EngineTelemetry] = None
+        """
+        Optional :class:`~chess.telemetry.EngineTelemetry`, see
+        :func:`~chess.engine.Protocol.enable_telemetry()`.
+        """
+
+        self.recorder: Optional[SessionRecorder] = None
+        """
+        Optional :class:`~chess.engine.SessionRecorder` that captures all
+        lines sent and received.
+        """
+
     def connection_made(self, transport: asyncio.BaseTransport) -> None:
         # SubprocessTransport expected, but not checked to allow duck typing.
         self.transport = transport  # type: ignore
@@ -1027,16 +1204,33 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
 
         self.returncode.set_result(code)
 
+        if self.recorder is not None:
+            self.recorder.close()
+
     def process_exited(self) -> None:
         LOGGER.debug("%s: Process exited", self)
 
     def send_line(self, line: str) -> None:
         LOGGER.debug("%s: << %s", self, line)
+        if self.telemetry is not None:
+            self.telemetry.line_sent(line)
+        if self.recorder is not None:
+            self.recorder.sent(line)
         assert self.transport is not None, "cannot send line before connection is made"
         stdin = self.transport.get_pipe_transport(0)
         # WriteTransport expected, but not checked to allow duck typing.
         stdin.write((line + "\n").encode("utf-8"))  # type: ignore
 
+    def _pause_reading(self) -> None:
+        stdout = self.transport.get_pipe_transport(1) if self.transport is not None else None
+        if stdout is not None:
+            stdout.pause_reading()  # type: ignore
+
+    def _resume_reading(self) -> None:
+        stdout = self.transport.get_pipe_transport(1) if self.transport is not None else None
+        if stdout is not None:
+            stdout.resume_reading()  # type: ignore
+
     def pipe_data_received(self, fd: int, data: Union[bytes, str]) -> None:
         self.buffer[fd].extend(data)  # type: ignore
         while b"\n" in self.buffer[fd]:
@@ -1049,6 +1243,8 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
                 LOGGER.warning("%s: >> %r (%s)", self, bytes(line_bytes), err)
             else:
                 if fd == 1:
+                    if self.recorder is not None:
+                        self.recorder.received(line)
                     self.loop.call_soon(self._line_received, line)
                 else:
                     self.loop.call_soon(self.error_line_received, line)
@@ -1059,11 +1255,34 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
     def _line_received(self: ProtocolT, line: str) -> None:
         LOGGER.debug("%s: >> %s", self, line)
 
+        telemetry = self.telemetry
+        if telemetry is not None:
+            start = time.perf_counter()
+
         self.line_received(line)
 
         if self.command:
             self.command._line_received(self, line)
 
+        if telemetry is not None:
+            telemetry.line_received(line, time.perf_counter() - start)
+
+    def enable_telemetry(self, registry: Optional[chess.telemetry.TelemetryRegistry] = None, *, name: Optional[str] = None) -> chess.telemetry.EngineTelemetry:
+        """
+        Starts recording :class:`~chess.telemetry.EngineTelemetry` for this
+        engine, and adds it to *registry* for export. Returns the existing
+        telemetry if it is already enabled.
+
+        :param name: Label of the engine in exports. Defaults to the name
+            the engine reported.
+        """
+        if self.telemetry is None:
+            self.telemetry = chess.telemetry.EngineTelemetry(name or self.id.get("name", "engine"))
+            self.telemetry.pid = self.transport.get_pid() if self.transport is not None else None
+        if registry is not None:
+            registry.register(self.telemetry)
+        return self.telemetry
+
     def line_received(self, line: str) -> None:
         pass
 
@@ -1215,8 +1434,31 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
 
         return analysis.info if multipv is None else analysis.multipv
 
+    async def analyse_many(self, boards: Iterable[chess.Board], limit: Limit, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, options: ConfigMapping = {}) -> AsyncIterator[Union[List[InfoDict], InfoDict]]:
+        """
+        Analyses a sequence of positions back to back and yields the
+        result of each, in order, as soon as its search is finished.
+
+        All positions are analysed as part of the same *game*, so the
+        engine is informed about a new game at most once.
+
+        *boards* is consumed lazily. The default implementation analyses
+        each position with :func:`~chess.engine.Protocol.analyse()` once the
+        consumer asks for its result. :class:`~chess.engine.UciProtocol`
+        runs all positions as one command instead: the engine is set up
+        once and the next position is sent as soon as the previous search
+        is finished, so at most one search runs ahead of the consumer.
+        Closing the iterator, or cancelling the task that consumes it,
+        stops the search in progress.
+
+        See :func:`~chess.engine.Protocol.analyse()` for the other
+        parameters.
+        """
+        for board in boards:
+            yield await self.analyse(board, limit, multipv=multipv, game=game, info=info, options=options)
+
     @abc.abstractmethod
-    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> AnalysisResult:
+    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, stream: Stream = Stream.UNBOUNDED, maxsize: int = 64) -> AnalysisResult:
         """
         Starts analysing a position.
 
@@ -1240,6 +1482,11 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
             analysis. The previous configuration will be restored after the
             analysis is complete. You can permanently apply a configuration
             with :func:`~chess.engine.Protocol.configure()`.
+        :param stream: Optional. How information is queued if it is
+            consumed slower than the engine sends it. One of
+            :class:`~chess.engine.Stream`. Defaults to an unbounded queue.
+        :param maxsize: Optional. The number of pending items at which a
+            ``Stream.BOUNDED`` stream stops reading from the engine.
 
         Returns :class:`~chess.engine.AnalysisResult`, a handle that allows
         asynchronously iterating over the information sent by the engine
@@ -1360,6 +1607,15 @@ class UciProtocol(Protocol):
     protocol.
     """
 
+    compact_position: bool = False
+    """
+    Send positions starting from the last irreversible move (a capture or
+    pawn move, as indicated by the halfmove clock), followed by only the
+    moves after it, instead of the root position and the entire move stack.
+    This is enough history for repetition detection and keeps commands short
+    late in long games.
+    """
+
     def __init__(self) -> None:
         super().__init__()
         self.options: UciOptionMap[Option] = UciOptionMap()
@@ -1371,6 +1627,7 @@ class UciProtocol(Protocol):
         self.first_game = True
         self.may_ponderhit: Optional[chess.Board] = None
         self.ponderhit = False
+        self._start_fen: Optional[Tuple[object, bool, str]] = None
 
     async def initialize(self) -> None:
         class UciInitializeCommand(BaseCommand[UciProtocol, None]):
@@ -1557,11 +1814,17 @@ class UciProtocol(Protocol):
         elif board.chess960:
             raise EngineError("engine does not support UCI_Chess960")
 
+        # Select the moves to send. In compact mode the history starts
+        # after the last zeroing move.
+        start = 0
+        if self.compact_position:
+            start = max(0, len(board.move_stack) - board.halfmove_clock)
+        moves = board.move_stack[start:] if start else board.move_stack
+
         # Send starting position.
         builder = ["position"]
-        safe_history = all(board.move_stack)
-        root = board.root() if safe_history else board
-        fen = root.fen(shredder=board.chess960, en_passant="fen")
+        safe_history = all(moves)
+        fen = self._history_fen(board, start) if safe_history and moves else board.fen(shredder=board.chess960, en_passant="fen")
         if uci_variant == "chess" and fen == chess.STARTING_FEN:
             builder.append("startpos")
         else:
@@ -1571,13 +1834,25 @@ class UciProtocol(Protocol):
         # Send moves.
         if not safe_history:
             LOGGER.warning("Not transmitting history with null moves to UCI engine")
-        elif board.move_stack:
+        elif moves:
             builder.append("moves")
-            builder.extend(move.uci() for move in board.move_stack)
+            builder.extend(move.uci() for move in moves)
 
         self.send_line(" ".join(builder))
         self.board = board.copy(stack=False)
 
+    def _history_fen(self, board: chess.Board, index: int) -> str:
+        # FEN of the position before the move at *index* of the move stack.
+        # Successive positions of the same game share their starting state,
+        # so the last one is remembered.
+        state = board._stack[index]
+        cached = self._start_fen
+        if cached is not None and cached[0] is state and cached[1] == board.chess960:
+            return cached[2]
+        fen = board._ancestor(index).fen(shredder=board.chess960, en_passant="fen")
+        self._start_fen = (state, board.chess960, fen)
+        return fen
+
     def _go(self, limit: Limit, *, root_moves: Optional[Iterable[chess.Move]] = None, ponder: bool = False, infinite: bool = False) -> None:
         builder = ["go"]
         if ponder:
@@ -1734,10 +2009,124 @@ class UciProtocol(Protocol):
 
         return await self.communicate(UciPlayCommand)
 
-    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> AnalysisResult:
+    async def analyse(self, board: chess.Board, limit: Limit, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> Union[List[InfoDict], InfoDict]:
+        # Only the aggregated information is returned, so info lines are
+        # stored as they arrive and parsed once the search is complete.
+        analysis = await self._analysis(board, limit, multipv=multipv, game=game, info=info, root_moves=root_moves, options=options, deferred=True)
+
+        with analysis:
+            await analysis.wait()
+
+        return analysis.info if multipv is None else analysis.multipv
+
+    async def analyse_many(self, boards: Iterable[chess.Board], limit: Limit, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, options: ConfigMapping = {}) -> AsyncIterator[Union[List[InfoDict], InfoDict]]:
+        # All positions are searched by a single command: options, the new
+        # game and isready are handled once, and each following position is
+        # sent with go as soon as the engine reports the previous bestmove.
+        results: asyncio.Queue[Optional[Union[List[InfoDict], InfoDict]]] = asyncio.Queue()
+        pending = iter(boards)
+
+        class UciAnalyseManyCommand(BaseCommand[UciProtocol, None]):
+            def start(self, engine: UciProtocol) -> None:
+                self.sent_isready = False
+                self.root_board: Optional[chess.Board] = None
+                self.lines: List[List[str]] = []
+
+                if "Ponder" in engine.options:
+                    engine._setoption("Ponder", False)
+                if "UCI_AnalyseMode" in engine.options and "UCI_AnalyseMode" not in engine.target_config and all(name.lower() != "uci_analysemode" for name in options):
+                    engine._setoption("UCI_AnalyseMode", True)
+                if "MultiPV" in engine.options or (multipv and multipv > 1):
+                    engine._setoption("MultiPV", 1 if multipv is None else multipv)
+
+                engine._configure(options)
+
+                if engine.first_game or engine.game != game:
+                    engine.game = game
+                    engine._ucinewgame()
+                    self.sent_isready = True
+                    engine._isready()
+                else:
+                    self._next(engine)
+
+            def line_received(self, engine: UciProtocol, line: str) -> None:
+                if line.startswith("info "):
+                    if info and self.root_board is not None:
+                        arg = line.split(" ", 1)[1]
+                        index = _uci_info_multipv(arg) - 1
+                        while len(self.lines) <= index:
+                            self.lines.append([])
+                        self.lines[index].append(arg)
+                elif line.startswith("bestmove "):
+                    self._bestmove(engine, line.split(" ", 1)[1])
+                elif line == "readyok" and self.sent_isready:
+                    self.sent_isready = False
+                    self._next(engine)
+                else:
+                    LOGGER.warning("%s: Unexpected engine output: %r", engine, line)
+
+            def _next(self, engine: UciProtocol) -> None:
+                board = next(pending, None)
+                if board is None or self.state == CommandState.CANCELLING:
+                    results.put_nowait(None)
+                    if not self.result.done():
+                        self.result.set_result(None)
+                    self.set_finished()
+                    return
+
+                engine._position(board)
+                self.root_board = engine.board
+                self.lines = []
+                engine._go(limit)
+
+            def _bestmove(self, engine: UciProtocol, arg: str) -> None:
+                if self.root_board is None:
+                    raise EngineError("was not searching, but engine sent bestmove")
+                _parse_uci_bestmove(engine.board, arg)
+
+                multipv_infos: List[InfoDict] = [{}]
+                for index, lines in enumerate(self.lines):
+                    parsed = _parse_uci_info_lines(lines, self.root_board, info) if lines else {}
+                    if parsed:
+                        while len(multipv_infos) <= index:
+                            multipv_infos.append({})
+                        multipv_infos[index].update(parsed)
+                self.root_board = None
+                results.put_nowait(multipv_infos[0] if multipv is None else multipv_infos)
+                self._next(engine)
+
+            def cancel(self, engine: UciProtocol) -> None:
+                if self.root_board is not None:
+                    engine.send_line("stop")
+
+        command = asyncio.ensure_future(self.communicate(UciAnalyseManyCommand))
+        get: Optional[asyncio.Future[Optional[Union[List[InfoDict], InfoDict]]]] = None
+        try:
+            while True:
+                get = asyncio.ensure_future(results.get())
+                await asyncio.wait([get, command], return_when=asyncio.FIRST_COMPLETED)
+                if not get.done() and (command.cancelled() or command.exception() is not None):
+                    command.result()
+                # Results are queued before the command finishes.
+                result = await get
+                if result is None:
+                    break
+                yield result
+        finally:
+            if get is not None:
+                get.cancel()
+            command.cancel()
+
+    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, stream: Stream = Stream.UNBOUNDED, maxsize: int = 64) -> AnalysisResult:
+        return await self._analysis(board, limit, multipv=multipv, game=game, info=info, root_moves=root_moves, options=options, stream=stream, maxsize=maxsize)
+
+    async def _analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, stream: Stream = Stream.UNBOUNDED, maxsize: int = 64, deferred: bool = False) -> AnalysisResult:
         class UciAnalysisCommand(BaseCommand[UciProtocol, AnalysisResult]):
             def start(self, engine: UciProtocol) -> None:
-                self.analysis = AnalysisResult(stop=lambda: self.cancel(engine))
+                if deferred:
+                    self.analysis = AnalysisResult(stop=lambda: self.cancel(engine), parse_deferred=lambda lines: _parse_uci_info_lines(lines, root_board, info))
+                else:
+                    self.analysis = AnalysisResult(stop=lambda: self.cancel(engine), stream=stream, maxsize=maxsize, pause_reading=engine._pause_reading, resume_reading=engine._resume_reading)
                 self.sent_isready = False
 
                 if "Ponder" in engine.options:
@@ -1768,8 +2157,10 @@ class UciProtocol(Protocol):
                     LOGGER.warning("%s: Unexpected engine output: %r", engine, line)
 
             def _readyok(self, engine: UciProtocol) -> None:
+                nonlocal root_board
                 self.sent_isready = False
                 engine._position(board)
+                root_board = engine.board
 
                 if limit:
                     engine._go(limit, root_moves=root_moves)
@@ -1779,12 +2170,24 @@ class UciProtocol(Protocol):
                 self.result.set_result(self.analysis)
 
             def _info(self, engine: UciProtocol, arg: str) -> None:
-                self.analysis.post(_parse_uci_info(arg, engine.board, info))
+                if deferred:
+                    if info:
+                        self.analysis.post_deferred(arg, _uci_info_multipv(arg))
+                else:
+                    self.analysis.post(_parse_uci_info(arg, engine.board, info))
 
             def _bestmove(self, engine: UciProtocol, arg: str) -> None:
                 if not self.result.done():
                     raise EngineError("was not searching, but engine sent bestmove")
-                best = _parse_uci_bestmove(engine.board, arg)
+                try:
+                    best = _parse_uci_bestmove(engine.board, arg)
+                except EngineError as err:
+                    # The analysis was already handed out, so it must carry
+                    # the error, for example of a replay that does not match
+                    # the position.
+                    self.set_finished()
+                    self.analysis.set_exception(err)
+                    return
                 self.set_finished()
                 self.analysis.set_finished(best)
 
@@ -1795,6 +2198,7 @@ class UciProtocol(Protocol):
                 LOGGER.debug("%s: Closing analysis because engine has been terminated (error: %s)", engine, exc)
                 self.analysis.set_exception(exc)
 
+        root_board = board
         return await self.communicate(UciAnalysisCommand)
 
     async def quit(self) -> None:
@@ -1804,39 +2208,57 @@ class UciProtocol(Protocol):
 
 UCI_REGEX = re.compile(r"^[a-h][1-8][a-h][1-8][pnbrqk]?|[PNBRQK]@[a-h][1-8]|0000\Z")
 
+_UCI_INFO_PARAMETERS = frozenset(["depth", "seldepth", "nodes", "multipv", "currmovenumber", "hashfull", "nps", "tbhits", "cpuload", "time", "ebf", "score", "currmove", "currline", "refutation", "pv", "wdl", "lowerbound", "upperbound"])
+
 def _parse_uci_info(arg: str, root_board: chess.Board, selector: Info = INFO_ALL) -> InfoDict:
     info: InfoDict = {}
     if not selector:
         return info
 
     tokens = arg.split(" ")
-    while tokens:
-        parameter = tokens.pop(0)
+    end = len(tokens)
+    i = 0
+
+    def push_moves(board: chess.Board, line: List[chess.Move]) -> None:
+        nonlocal i
+        while i < end and UCI_REGEX.match(tokens[i]):
+            i += 1
+            line.append(board.push_uci(tokens[i - 1]))
+
+    while i < end:
+        parameter = tokens[i]
+        i += 1
 
         if parameter == "string":
-            info["string"] = " ".join(tokens)
+            info["string"] = " ".join(tokens[i:])
             break
         elif parameter in ["depth", "seldepth", "nodes", "multipv", "currmovenumber", "hashfull", "nps", "tbhits", "cpuload"]:
             try:
-                info[parameter] = int(tokens.pop(0))  # type: ignore
+                i += 1
+                info[parameter] = int(tokens[i - 1])  # type: ignore
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing %s from info: %r", parameter, arg)
         elif parameter == "time":
             try:
-                info["time"] = int(tokens.pop(0)) / 1000.0
+                i += 1
+                info["time"] = int(tokens[i - 1]) / 1000.0
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing %s from info: %r", parameter, arg)
         elif parameter == "ebf":
             try:
-                info["ebf"] = float(tokens.pop(0))
+                i += 1
+                info["ebf"] = float(tokens[i - 1])
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing %s from info: %r", parameter, arg)
         elif parameter == "score" and selector & INFO_SCORE:
             try:
-                kind = tokens.pop(0)
-                value = tokens.pop(0)
-                if tokens and tokens[0] in ["lowerbound", "upperbound"]:
-                    info[tokens.pop(0)] = True  # type: ignore
+                kind = tokens[i]
+                i += 1
+                value = tokens[i]
+                i += 1
+                if i < end and tokens[i] in ["lowerbound", "upperbound"]:
+                    info[tokens[i]] = True  # type: ignore
+                    i += 1
                 if kind == "cp":
                     info["score"] = PovScore(Cp(int(value)), root_board.turn)
                 elif kind == "mate":
@@ -1847,7 +2269,8 @@ def _parse_uci_info(arg: str, root_board: chess.Board, selector: Info = INFO_ALL
                 LOGGER.error("Exception parsing score from info: %r", arg)
         elif parameter == "currmove":
             try:
-                info["currmove"] = chess.Move.from_uci(tokens.pop(0))
+                i += 1
+                info["currmove"] = chess.Move.from_uci(tokens[i - 1])
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing currmove from info: %r", arg)
         elif parameter == "currline" and selector & INFO_CURRLINE:
@@ -1855,13 +2278,12 @@ def _parse_uci_info(arg: str, root_board: chess.Board, selector: Info = INFO_ALL
                 if "currline" not in info:
                     info["currline"] = {}
 
-                cpunr = int(tokens.pop(0))
+                i += 1
+                cpunr = int(tokens[i - 1])
                 currline: List[chess.Move] = []
                 info["currline"][cpunr] = currline
 
-                board = root_board.copy(stack=False)
-                while tokens and UCI_REGEX.match(tokens[0]):
-                    currline.append(board.push_uci(tokens.pop(0)))
+                push_moves(root_board.copy(stack=False), currline)
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing currline from info: %r, position at root: %s", arg, root_board.fen())
         elif parameter == "refutation" and selector & INFO_REFUTATION:
@@ -1870,32 +2292,97 @@ def _parse_uci_info(arg: str, root_board: chess.Board, selector: Info = INFO_ALL
                     info["refutation"] = {}
 
                 board = root_board.copy(stack=False)
-                refuted = board.push_uci(tokens.pop(0))
+                i += 1
+                refuted = board.push_uci(tokens[i - 1])
 
                 refuted_by: List[chess.Move] = []
                 info["refutation"][refuted] = refuted_by
 
-                while tokens and UCI_REGEX.match(tokens[0]):
-                    refuted_by.append(board.push_uci(tokens.pop(0)))
+                push_moves(board, refuted_by)
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing refutation from info: %r, position at root: %s", arg, root_board.fen())
         elif parameter == "pv" and selector & INFO_PV:
             try:
                 pv: List[chess.Move] = []
                 info["pv"] = pv
-                board = root_board.copy(stack=False)
-                while tokens and UCI_REGEX.match(tokens[0]):
-                    pv.append(board.push_uci(tokens.pop(0)))
+                push_moves(root_board.copy(stack=False), pv)
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing pv from info: %r, position at root: %s", arg, root_board.fen())
         elif parameter == "wdl":
             try:
-                info["wdl"] = PovWdl(Wdl(int(tokens.pop(0)), int(tokens.pop(0)), int(tokens.pop(0))), root_board.turn)
+                wdl = []
+                for _ in range(3):
+                    i += 1
+                    wdl.append(int(tokens[i - 1]))
+                info["wdl"] = PovWdl(Wdl(*wdl), root_board.turn)
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing wdl from info: %r", arg)
 
     return info
 
+def _uci_info_parameters(tokens: List[str]) -> typing.Set[str]:
+    # Parameter names that appear in an info line. Values never collide
+    # with names, and everything after "string" is part of the string.
+    try:
+        tokens = tokens[:tokens.index("string")]
+    except ValueError:
+        return _UCI_INFO_PARAMETERS.intersection(tokens)
+    return _UCI_INFO_PARAMETERS.intersection(tokens) | {"string"}
+
+def _uci_info_multipv(arg: str) -> int:
+    tokens = arg.split(" ")
+    for i, token in enumerate(tokens):
+        if token == "string":
+            break
+        elif token == "multipv":
+            try:
+                return int(tokens[i + 1])
+            except (ValueError, IndexError):
+                break
+    return 1
+
+def _parse_uci_info_lines(args: List[str], root_board: chess.Board, selector: Info = INFO_ALL) -> InfoDict:
+    """
+    Aggregates several info lines, like parsing each line and updating a
+    dictionary with them in order (exactly so for well-formed lines), but
+    parses only what survives: lines are
+    visited from the last to the first, and a line is skipped if it can not
+    add any parameter that is still missing. Scores and lines of moves are
+    not parsed again once they are known.
+    """
+    info: InfoDict = {}
+    if not selector:
+        return info
+
+    unselected = set()
+    if not selector & INFO_SCORE:
+        unselected |= {"score", "lowerbound", "upperbound"}
+    if not selector & INFO_PV:
+        unselected.add("pv")
+    if not selector & INFO_REFUTATION:
+        unselected.add("refutation")
+    if not selector & INFO_CURRLINE:
+        unselected.add("currline")
+
+    for arg in reversed(args):
+        parameters = _uci_info_parameters(arg.split(" ")) - unselected
+        if parameters <= info.keys():
+            continue
+
+        line_selector = selector
+        if "score" in info and not parameters & {"lowerbound", "upperbound"} - info.keys():
+            line_selector &= ~INFO_SCORE
+        if "pv" in info:
+            line_selector &= ~INFO_PV
+        if "refutation" in info:
+            line_selector &= ~INFO_REFUTATION
+        if "currline" in info:
+            line_selector &= ~INFO_CURRLINE
+
+        for key, value in _parse_uci_info(arg, root_board, Info(line_selector) or INFO_BASIC).items():
+            info.setdefault(key, value)  # type: ignore
+    return info
+
 def _parse_uci_bestmove(board: chess.Board, args: str) -> BestMove:
     tokens = args.split()
 
@@ -2325,7 +2812,7 @@ class XBoardProtocol(Protocol):
 
         return await self.communicate(XBoardPlayCommand)
 
-    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> AnalysisResult:
+    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, stream: Stream = Stream.UNBOUNDED, maxsize: int = 64) -> AnalysisResult:
         if multipv is not None:
             raise EngineError("xboard engine does not support multipv")
 
@@ -2336,7 +2823,7 @@ class XBoardProtocol(Protocol):
             def start(self, engine: XBoardProtocol) -> None:
                 self.stopped = False
                 self.best_move: Optional[chess.Move] = None
-                self.analysis = AnalysisResult(stop=lambda: self.cancel(engine))
+                self.analysis = AnalysisResult(stop=lambda: self.cancel(engine), stream=stream, maxsize=maxsize, pause_reading=engine._pause_reading, resume_reading=engine._resume_reading)
                 self.final_pong: Optional[str] = None
 
                 engine._new(board, game, options)
@@ -2611,21 +3098,41 @@ class AnalysisResult:
     Can be used to asynchronously iterate over information sent by the engine.
 
     Automatically stops the analysis when used as a context manager.
-    """
 
-    multipv: List[chess.engine.InfoDict]
-    """
-    A list of dictionaries with aggregated information sent by the engine.
-    One item for each root move.
+    The *stream* policy determines how information is queued for a slow
+    consumer, see :class:`~chess.engine.Stream`. The aggregated
+    :data:`~chess.engine.AnalysisResult.multipv` is always complete.
     """
 
-    def __init__(self, stop: Optional[Callable[[], None]] = None):
+    def __init__(self, stop: Optional[Callable[[], None]] = None, *, parse_deferred: Optional[Callable[[List[str]], InfoDict]] = None, stream: Stream = Stream.UNBOUNDED, maxsize: int = 64, pause_reading: Optional[Callable[[], None]] = None, resume_reading: Optional[Callable[[], None]] = None):
+        if maxsize < 1:
+            raise ValueError(f"expected maxsize >= 1, got {maxsize}")
+
         self._stop = stop
         self._queue: asyncio.Queue[InfoDict] = asyncio.Queue()
         self._posted_kork = False
         self._seen_kork = False
         self._finished: asyncio.Future[BestMove] = asyncio.Future()
-        self.multipv = [{}]
+        self._multipv: List[InfoDict] = [{}]
+        self._parse_deferred = parse_deferred
+        self._deferred: List[List[str]] = []
+
+        self.stream = stream
+        self.maxsize = maxsize
+        self._pause_reading = pause_reading if stream == Stream.BOUNDED else None
+        self._resume_reading = resume_reading
+        self._paused = False
+        self._pending: Dict[int, InfoDict] = {}
+
+    @property
+    def multipv(self) -> List[InfoDict]:
+        """
+        A list of dictionaries with aggregated information sent by the engine.
+        One item for each root move.
+        """
+        if self._deferred:
+            self._resolve_deferred()
+        return self._multipv
 
     def post(self, info: InfoDict) -> None:
         # Empty dictionary reserved for kork.
@@ -2633,12 +3140,51 @@ class AnalysisResult:
             return
 
         multipv = info.get("multipv", 1)
-        while len(self.multipv) < multipv:
-            self.multipv.append({})
-        self.multipv[multipv - 1].update(info)
+        while len(self._multipv) < multipv:
+            self._multipv.append({})
+        self._multipv[multipv - 1].update(info)
+
+        if self.stream == Stream.LATEST:
+            pending = self._pending.get(multipv)
+            if pending is not None:
+                pending.update(info)
+                return
+            info = self._pending[multipv] = info.copy()
 
         self._queue.put_nowait(info)
 
+        if self._pause_reading is not None and not self._paused and self._queue.qsize() >= self.maxsize:
+            self._paused = True
+            self._pause_reading()
+
+    def _resume(self, *, backpressure: bool = True) -> None:
+        if not backpressure:
+            self._pause_reading = None
+        if self._paused and (self._pause_reading is None or self._queue.qsize() <= self.maxsize // 2):
+            self._paused = False
+            if self._resume_reading is not None:
+                self._resume_reading()
+
+    def post_deferred(self, line: str, multipv: int = 1) -> None:
+        # Stores a raw line, to be parsed only when the aggregated
+        # information is read. Nothing is posted to the queue.
+        while len(self._deferred) < multipv:
+            self._deferred.append([])
+        self._deferred[multipv - 1].append(line)
+
+    def _resolve_deferred(self) -> None:
+        assert self._parse_deferred is not None
+        deferred, self._deferred = self._deferred, []
+        for multipv, lines in enumerate(deferred, 1):
+            if not lines:
+                continue
+            info = self._parse_deferred(lines)
+            if not info:
+                continue
+            while len(self._multipv) < multipv:
+                self._multipv.append({})
+            self._multipv[multipv - 1].update(info)
+
     def _kork(self) -> None:
         if not self._posted_kork:
             self._posted_kork = True
@@ -2666,9 +3212,16 @@ class AnalysisResult:
         if self._stop and not self._posted_kork:
             self._stop()
             self._stop = None
+        # The engine must be heard to finish.
+        self._resume(backpressure=False)
 
     async def wait(self) -> BestMove:
-        """Waits until the analysis is finished."""
+        """
+        Waits until the analysis is finished. With a bounded stream, this
+        lifts the back-pressure, because information that is not consumed
+        would otherwise block the engine forever.
+        """
+        self._resume(backpressure=False)
         return await self._finished
 
     async def get(self) -> InfoDict:
@@ -2693,6 +3246,10 @@ class AnalysisResult:
             await self._finished
             raise AnalysisComplete()
 
+        if self.stream == Stream.LATEST:
+            del self._pending[info.get("multipv", 1)]
+        elif self._paused:
+            self._resume()
         return info
 
     def would_block(self) -> bool:
@@ -2740,7 +3297,7 @@ class AnalysisResult:
         self.stop()
 
 
-async def popen_uci(command: Union[str, List[str]], *, setpgrp: bool = False, **popen_args: Any) -> Tuple[asyncio.SubprocessTransport, UciProtocol]:
+async def popen_uci(command: Union[str, List[str]], *, setpgrp: bool = False, record: Optional[str] = None, **popen_args: Any) -> Tuple[asyncio.SubprocessTransport, UciProtocol]:
     """
     Spawns and initializes a UCI engine.
 
@@ -2749,6 +3306,8 @@ async def popen_uci(command: Union[str, List[str]], *, setpgrp: bool = False, **
     :param setpgrp: Open the engine process in a new process group. This will
         stop signals (such as keyboard interrupts) from propagating from the
         parent process. Defaults to ``False``.
+    :param record: Optional. Path of a file to record the session to, so
+        that it can be served back by :func:`~chess.engine.replay()`.
     :param popen_args: Additional arguments for
         `popen <https://docs.python.org/3/library/subprocess.html#popen-constructor>`_.
         Do not set ``stdin``, ``stdout``, ``bufsize`` or
@@ -2757,6 +3316,8 @@ async def popen_uci(command: Union[str, List[str]], *, setpgrp: bool = False, **
     Returns a subprocess transport and engine protocol pair.
     """
     transport, protocol = await UciProtocol.popen(command, setpgrp=setpgrp, **popen_args)
+    if record is not None:
+        protocol.recorder = SessionRecorder(record, protocol="UciProtocol", command=command)
     try:
         await protocol.initialize()
     except:
@@ -2765,7 +3326,7 @@ async def popen_uci(command: Union[str, List[str]], *, setpgrp: bool = False, **
     return transport, protocol
 
 
-async def popen_xboard(command: Union[str, List[str]], *, setpgrp: bool = False, **popen_args: Any) -> Tuple[asyncio.SubprocessTransport, XBoardProtocol]:
+async def popen_xboard(command: Union[str, List[str]], *, setpgrp: bool = False, record: Optional[str] = None, **popen_args: Any) -> Tuple[asyncio.SubprocessTransport, XBoardProtocol]:
     """
     Spawns and initializes an XBoard engine.
 
@@ -2774,6 +3335,8 @@ async def popen_xboard(command: Union[str, List[str]], *, setpgrp: bool = False,
     :param setpgrp: Open the engine process in a new process group. This will
         stop signals (such as keyboard interrupts) from propagating from the
         parent process. Defaults to ``False``.
+    :param record: Optional. Path of a file to record the session to, so
+        that it can be served back by :func:`~chess.engine.replay()`.
     :param popen_args: Additional arguments for
         `popen <https://docs.python.org/3/library/subprocess.html#popen-constructor>`_.
         Do not set ``stdin``, ``stdout``, ``bufsize`` or
@@ -2782,6 +3345,8 @@ async def popen_xboard(command: Union[str, List[str]], *, setpgrp: bool = False,
     Returns a subprocess transport and engine protocol pair.
     """
     transport, protocol = await XBoardProtocol.popen(command, setpgrp=setpgrp, **popen_args)
+    if record is not None:
+        protocol.recorder = SessionRecorder(record, protocol="XBoardProtocol", command=command)
     try:
         await protocol.initialize()
     except:
@@ -2790,6 +3355,29 @@ async def popen_xboard(command: Union[str, List[str]], *, setpgrp: bool = False,
     return transport, protocol
 
 
+async def replay(path: str, *, timing: bool = False, strict: bool = True) -> Tuple[ReplayTransport, Protocol]:
+    """
+    Serves back a session recorded with ``record=path`` and initializes
+    the protocol, without starting an engine.
+
+    :param timing: Answer with the delays of the recording, rather than at
+        full speed.
+    :param strict: See :class:`~chess.engine.ReplayTransport`.
+
+    Returns a replay transport and engine protocol pair.
+    """
+    with open(path) as f:
+        header = json.loads(f.readline())
+    Protocol = {"UciProtocol": UciProtocol, "XBoardProtocol": XBoardProtocol}[header["protocol"]]
+    protocol = Protocol()
+    transport = ReplayTransport(protocol, path, timing=timing, strict=strict)
+    try:
+        await protocol.initialize()
+    except:
+        transport.close()
+        raise
+    return transport, protocol
+
 async def _async(sync: Callable[[], T]) -> T:
     return sync()
 
@@ -2822,6 +3410,45 @@ class SimpleEngine:
 
         self.returncode: concurrent.futures.Future[int] = concurrent.futures.Future()
 
+        self.cache: Optional[AnalysisCache] = None
+        """
+        Optional :class:`~chess.engine.AnalysisCache` that is consulted by
+        :func:`~chess.engine.SimpleEngine.analyse()` before searching.
+        """
+
+        # Cache identity of the current configuration, and how often the
+        # engine has been configured, so that a configure() racing with the
+        # lookup does not leave a stale identity behind.
+        self._identity_lock = threading.Lock()
+        self._identity: Optional[Tuple[str, Dict[str, ConfigValue]]] = None
+        self._configured = 0
+
+    def _cache_identity(self) -> Tuple[str, Dict[str, ConfigValue]]:
+        # The engine name and the configured options that differ from their
+        # defaults, which both change the results that go into the cache.
+        # Computed once and again only after configure().
+        with self._identity_lock:
+            if self._identity is not None:
+                return self._identity
+            configured = self._configured
+
+        def identity() -> Tuple[str, Dict[str, ConfigValue]]:
+            options = {}
+            for name, value in self.protocol.target_config.items():
+                option = self.protocol.options.get(name)
+                if option is None or str(value).lower() != str(option.default).lower():
+                    options[name] = value
+            return self.protocol.id.get("name", ""), options
+
+        with self._not_shut_down():
+            future = asyncio.run_coroutine_threadsafe(_async(identity), self.protocol.loop)
+        result = future.result()
+
+        with self._identity_lock:
+            if configured == self._configured:
+                self._identity = result
+        return result
+
     def _timeout_for(self, limit: Optional[Limit]) -> Optional[float]:
         if self.timeout is None or limit is None or limit.time is None:
             return None
@@ -2858,7 +3485,12 @@ class SimpleEngine:
         with self._not_shut_down():
             coro = asyncio.wait_for(self.protocol.configure(options), self.timeout)
             future = asyncio.run_coroutine_threadsafe(coro, self.protocol.loop)
-        return future.result()
+        try:
+            return future.result()
+        finally:
+            with self._identity_lock:
+                self._identity = None
+                self._configured += 1
 
     def send_opponent_information(self, *, opponent: Optional[Opponent] = None, engine_rating: Optional[int] = None) -> None:
         with self._not_shut_down():
@@ -2868,6 +3500,16 @@ class SimpleEngine:
             future = asyncio.run_coroutine_threadsafe(coro, self.protocol.loop)
         return future.result()
         
+    @property
+    def telemetry(self) -> Optional[chess.telemetry.EngineTelemetry]:
+        return self.protocol.telemetry
+
+    def enable_telemetry(self, registry: Optional[chess.telemetry.TelemetryRegistry] = None, *, name: Optional[str] = None) -> chess.telemetry.EngineTelemetry:
+        with self._not_shut_down():
+            coro = _async(lambda: self.protocol.enable_telemetry(registry, name=name))
+            future = asyncio.run_coroutine_threadsafe(coro, self.protocol.loop)
+        return future.result()
+
     def ping(self) -> None:
         with self._not_shut_down():
             coro = asyncio.wait_for(self.protocol.ping(), self.timeout)
@@ -2889,17 +3531,95 @@ class SimpleEngine:
     @typing.overload
     def analyse(self, board: chess.Board, limit: Limit, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> Union[InfoDict, List[InfoDict]]: ...
     def analyse(self, board: chess.Board, limit: Limit, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> Union[InfoDict, List[InfoDict]]:
+        cache = self.cache if root_moves is None and not options else None
+        if cache is not None:
+            engine_name, config = self._cache_identity()
+            cached = cache.get(board, limit, multipv=multipv, info=info, engine_name=engine_name, options=config)
+            if cached is not None:
+                return cached[0] if multipv is None else cached
+
         with self._not_shut_down():
             coro = asyncio.wait_for(
                 self.protocol.analyse(board, limit, multipv=multipv, game=game, info=info, root_moves=root_moves, options=options),
                 self._timeout_for(limit))
             future = asyncio.run_coroutine_threadsafe(coro, self.protocol.loop)
-        return future.result()
+        result = future.result()
+
+        if cache is not None:
+            cache.put(board, limit, [result] if multipv is None else result, multipv=multipv, info=info, engine_name=engine_name, options=config)  # type: ignore
+        return result
+
+    def analyse_many(self, boards: Iterable[chess.Board], limit: Limit, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, options: ConfigMapping = {}, prefetch: int = 8) -> Iterator[Union[InfoDict, List[InfoDict]]]:
+        """
+        Analyses a list of positions and yields the result of each, in
+        order.
+
+        All positions are handed to the background event loop at once and
+        searched back to back with
+        :func:`~chess.engine.Protocol.analyse_many()`, without a round trip
+        between threads for each position. Up to *prefetch* results, and
+        the search in progress, are held ahead of the consumer. Results are taken from the analysis cache where possible.
+
+        The positions are read from the background thread, so they must not
+        be modified until their result has been yielded. Closing the
+        iterator early stops the search in progress.
+        """
+        boards = list(boards)
+        if prefetch < 1:
+            raise ValueError(f"expected prefetch >= 1, got {prefetch}")
+
+        cache = self.cache if not options else None
+        if cache is not None:
+            engine_name, config = self._cache_identity()
+        cached = [cache.get(board, limit, multipv=multipv, info=info, engine_name=engine_name, options=config) if cache is not None else None for board in boards]
+        pending = [board for board, result in zip(boards, cached) if result is None]
+
+        results: queue.SimpleQueue[Tuple[bool, Any]] = queue.SimpleQueue()
+        timeout = self._timeout_for(limit)
+        credits: List[asyncio.Semaphore] = []
+
+        async def produce() -> None:
+            credits.append(asyncio.Semaphore(prefetch))
+            searched = self.protocol.analyse_many(pending, limit, multipv=multipv, game=game, info=info, options=options)
+            try:
+                for _ in pending:
+                    await credits[0].acquire()
+                    result = await asyncio.wait_for(searched.__anext__(), timeout)
+                    results.put((True, result))
+            except asyncio.CancelledError:
+                # Closed by the consumer, or the engine is shutting down.
+                results.put((False, EngineTerminatedError("analysis cancelled")))
+                raise
+            except BaseException as exc:
+                results.put((False, exc))
+            finally:
+                await searched.aclose()
+
+        with self._not_shut_down():
+            future = asyncio.run_coroutine_threadsafe(produce(), self.protocol.loop)
+
+        try:
+            for board, result in zip(boards, cached):
+                if result is not None:
+                    yield result[0] if multipv is None else result
+                    continue
+
+                ok, result = results.get()
+                if not ok:
+                    raise result
+                with self._not_shut_down():
+                    self.protocol.loop.call_soon_threadsafe(credits[0].release)
+
+                if cache is not None:
+                    cache.put(board, limit, [result] if multipv is None else result, multipv=multipv, info=info, engine_name=engine_name, options=config)
+                yield result
+        finally:
+            future.cancel()
 
-    def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> SimpleAnalysisResult:
+    def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, stream: Stream = Stream.UNBOUNDED, maxsize: int = 64) -> SimpleAnalysisResult:
         with self._not_shut_down():
             coro = asyncio.wait_for(
-                self.protocol.analysis(board, limit, multipv=multipv, game=game, info=info, root_moves=root_moves, options=options),
+                self.protocol.analysis(board, limit, multipv=multipv, game=game, info=info, root_moves=root_moves, options=options, stream=stream, maxsize=maxsize),
                 self.timeout)  # Timeout until analysis is *started*
             future = asyncio.run_coroutine_threadsafe(coro, self.protocol.loop)
         return SimpleAnalysisResult(self, future.result())
@@ -2924,10 +3644,15 @@ class SimpleEngine:
                 self.protocol.loop.call_soon_threadsafe(_shutdown)
 
     @classmethod
-    def popen(cls, Protocol: Type[Protocol], command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, debug: bool = False, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+    def popen(cls, Protocol: Type[Protocol], command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, debug: bool = False, setpgrp: bool = False, host: Optional[EngineHost] = None, record: Optional[str] = None, **popen_args: Any) -> SimpleEngine:
+        # Debug mode is a property of the event loop. An engine on a host
+        # shares the host's loop, whose mode was fixed by EngineHost(debug=...).
         async def background(future: concurrent.futures.Future[SimpleEngine]) -> None:
             transport, protocol = await Protocol.popen(command, setpgrp=setpgrp, **popen_args)
-            threading.current_thread().name = f"{cls.__name__} (pid={transport.get_pid()})"
+            if host is None:
+                threading.current_thread().name = f"{cls.__name__} (pid={transport.get_pid()})"
+            if record is not None:
+                protocol.recorder = SessionRecorder(record, protocol=Protocol.__name__, command=command)
             simple_engine = cls(transport, protocol, timeout=timeout)
             try:
                 await asyncio.wait_for(protocol.initialize(), timeout)
@@ -2938,23 +3663,54 @@ class SimpleEngine:
                 simple_engine.close()
             await simple_engine.shutdown_event.wait()
 
+        if host is not None:
+            return host.run(background)
         return run_in_background(background, name=f"{cls.__name__} (command={command!r})", debug=debug)
 
     @classmethod
-    def popen_uci(cls, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, debug: bool = False, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+    def popen_uci(cls, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, debug: bool = False, setpgrp: bool = False, host: Optional[EngineHost] = None, record: Optional[str] = None, **popen_args: Any) -> SimpleEngine:
         """
         Spawns and initializes a UCI engine.
         Returns a :class:`~chess.engine.SimpleEngine` instance.
+
+        The engine runs on its own background event loop, or on the shared
+        loop of *host*, see :class:`~chess.engine.EngineHost`. *debug*
+        enables asyncio debug mode for the engine's own loop and has no
+        effect when *host* is given; pass ``debug=True`` to the host
+        instead. The session is recorded to the file *record* if given, see
+        :func:`~chess.engine.SimpleEngine.replay()`.
         """
-        return cls.popen(UciProtocol, command, timeout=timeout, debug=debug, setpgrp=setpgrp, **popen_args)
+        return cls.popen(UciProtocol, command, timeout=timeout, debug=debug, setpgrp=setpgrp, host=host, record=record, **popen_args)
 
     @classmethod
-    def popen_xboard(cls, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, debug: bool = False, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+    def popen_xboard(cls, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, debug: bool = False, setpgrp: bool = False, host: Optional[EngineHost] = None, record: Optional[str] = None, **popen_args: Any) -> SimpleEngine:
         """
         Spawns and initializes an XBoard engine.
         Returns a :class:`~chess.engine.SimpleEngine` instance.
+
+        *debug* has no effect when *host* is given, see
+        :func:`~chess.engine.SimpleEngine.popen_uci()`.
         """
-        return cls.popen(XBoardProtocol, command, timeout=timeout, debug=debug, setpgrp=setpgrp, **popen_args)
+        return cls.popen(XBoardProtocol, command, timeout=timeout, debug=debug, setpgrp=setpgrp, host=host, record=record, **popen_args)
+
+    @classmethod
+    def replay(cls, path: str, *, timing: bool = False, strict: bool = True, timeout: Optional[float] = 10.0, debug: bool = False) -> SimpleEngine:
+        """
+        Serves back a session recorded with ``record=path`` in place of
+        the engine. See :func:`chess.engine.replay()`.
+        """
+        async def background(future: concurrent.futures.Future[SimpleEngine]) -> None:
+            transport, protocol = await replay(path, timing=timing, strict=strict)
+            simple_engine = cls(transport, protocol, timeout=timeout)  # type: ignore
+            try:
+                future.set_result(simple_engine)
+                returncode = await protocol.returncode
+                simple_engine.returncode.set_result(returncode)
+            finally:
+                simple_engine.close()
+            await simple_engine.shutdown_event.wait()
+
+        return run_in_background(background, name=f"{cls.__name__} (replay={path!r})", debug=debug)
 
     def __enter__(self) -> SimpleEngine:
         return self
@@ -2971,6 +3727,10 @@ class SimpleAnalysisResult:
     """
     Synchronous wrapper around :class:`~chess.engine.AnalysisResult`. Returned
     by :func:`chess.engine.SimpleEngine.analysis()`.
+
+    Pass ``stream=Stream.LATEST`` or ``stream=Stream.BOUNDED`` to
+    :func:`~chess.engine.SimpleEngine.analysis()` to keep memory flat when
+    the information is consumed slower than the engine sends it.
     """
 
     def __init__(self, simple_engine: SimpleEngine, inner: AnalysisResult) -> None:
@@ -3038,3 +3798,573 @@ class SimpleAnalysisResult:
 
     def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
         self.stop()
+
+
+class AnalysisCache:
+    """
+    Persistent cache of analysis results, backed by an SQLite database.
+
+    Entries are keyed by the Polyglot Zobrist hash of the position, the
+    search limit, the number of principal variations, the requested
+    :class:`~chess.engine.Info`, the name of the engine and its configured
+    options, and store the complete info dictionary of each line. Move
+    history is not part of the key, so a cached result may ignore
+    repetitions that the engine would have seen.
+
+    Attach a cache to a :class:`~chess.engine.SimpleEngine` by setting
+    :data:`~chess.engine.SimpleEngine.cache`, or pass it to
+    :class:`~chess.engine.EnginePool`. The engine name and options are
+    looked up once and again after
+    :func:`~chess.engine.SimpleEngine.configure()`, so configure the engine
+    through the :class:`~chess.engine.SimpleEngine` while a cache is
+    attached.
+
+    The database can be shared between threads and processes. Each process
+    opens its own connection, so the cache can be passed to
+    :mod:`multiprocessing` workers.
+
+    :param path: Path of the database file. It is created if it does not
+        exist.
+    :param max_entries: The least recently used entries are evicted when
+        the cache grows beyond this size.
+    """
+
+    def __init__(self, path: str, *, max_entries: int = 1_000_000, timeout: float = 60.0) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._puts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS analysis (zobrist INTEGER NOT NULL, params TEXT NOT NULL, lines TEXT NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (zobrist, params))")
+            connection.execute("CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used)")
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _key(self, board: chess.Board, limit: Limit, multipv: Optional[int], info: Info, engine_name: str, options: ConfigMapping) -> Tuple[int, str]:
+        zobrist = chess.polyglot.zobrist_hash(board)
+        if zobrist >= 0x8000000000000000:
+            zobrist -= 0x10000000000000000  # SQLite integers are signed
+        variant = type(board).uci_variant + ("960" if board.chess960 else "")
+        config = json.dumps({name.lower(): value for name, value in options.items()}, sort_keys=True, default=str)
+        return zobrist, f"{engine_name}|{config}|{variant}|{multipv}|{info.value}|{limit!r}"
+
+    def get(self, board: chess.Board, limit: Limit, *, multipv: Optional[int] = None, info: Info = INFO_ALL, engine_name: str = "", options: ConfigMapping = {}) -> Optional[List[InfoDict]]:
+        """
+        Looks up a cached analysis. Returns a list with one dictionary for
+        each principal variation, or ``None`` if the position is not
+        cached.
+
+        *options* are the engine options that differ from their defaults.
+        """
+        key = self._key(board, limit, multipv, info, engine_name, options)
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT lines FROM analysis WHERE zobrist = ? AND params = ?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            connection.execute("UPDATE analysis SET last_used = ? WHERE zobrist = ? AND params = ?", (time.time(), *key))
+
+        return [_decode_info(line, board.turn) for line in json.loads(row[0])]
+
+    def put(self, board: chess.Board, limit: Limit, infos: List[InfoDict], *, multipv: Optional[int] = None, info: Info = INFO_ALL, engine_name: str = "", options: ConfigMapping = {}) -> None:
+        """
+        Stores the analysis of a position. Incomplete results, without a
+        score or with an empty principal variation where one was requested,
+        are not stored.
+        """
+        if not infos or any("score" not in line or (info & INFO_PV and not line.get("pv")) for line in infos):
+            return
+
+        key = self._key(board, limit, multipv, info, engine_name, options)
+        lines = json.dumps([_encode_info(line) for line in infos])
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO analysis (zobrist, params, lines, last_used) VALUES (?, ?, ?, ?)", (*key, lines, time.time()))
+
+            # Check the size only every now and then.
+            self._puts += 1
+            if self._puts % 1000 == 0:
+                self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        excess = connection.execute("SELECT COUNT(*) FROM analysis").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute("DELETE FROM analysis WHERE rowid IN (SELECT rowid FROM analysis ORDER BY last_used LIMIT ?)", (excess, ))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+
+    def close(self) -> None:
+        """Evicts excess entries and closes the database connection."""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._evict(self._connection)
+                self._connection.close()
+            self._connection = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"path": self.path, "max_entries": self.max_entries, "timeout": self.timeout}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["path"], max_entries=state["max_entries"], timeout=state["timeout"])  # type: ignore
+
+    def __enter__(self) -> AnalysisCache:
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} (path={self.path!r}, hits={self.hits}, misses={self.misses})>"
+
+
+def _encode_info(info: InfoDict) -> Dict[str, Any]:
+    encoded: Dict[str, Any] = {}
+    for key, value in info.items():
+        if key == "score":
+            relative = value.relative
+            encoded[key] = ["mate", relative.mate()] if relative.is_mate() else ["cp", relative.score()]
+        elif key == "wdl":
+            encoded[key] = list(value.relative)
+        elif key == "currmove":
+            encoded[key] = value.uci()
+        elif key == "pv":
+            encoded[key] = [move.uci() for move in value]
+        elif key == "refutation":
+            encoded[key] = [[move.uci(), [m.uci() for m in line]] for move, line in value.items()]
+        elif key == "currline":
+            encoded[key] = [[cpu, [move.uci() for move in line]] for cpu, line in value.items()]
+        else:
+            encoded[key] = value
+    return encoded
+
+def _decode_info(encoded: Dict[str, Any], turn: Color) -> InfoDict:
+    info: InfoDict = {}
+    for key, value in encoded.items():
+        if key == "score":
+            kind, score = value
+            info["score"] = PovScore(Mate(score) if kind == "mate" else Cp(score), turn)
+        elif key == "wdl":
+            info["wdl"] = PovWdl(Wdl(*value), turn)
+        elif key == "currmove":
+            info["currmove"] = chess.Move.from_uci(value)
+        elif key == "pv":
+            info["pv"] = [chess.Move.from_uci(move) for move in value]
+        elif key == "refutation":
+            info["refutation"] = {chess.Move.from_uci(move): [chess.Move.from_uci(m) for m in line] for move, line in value}
+        elif key == "currline":
+            info["currline"] = {cpu: [chess.Move.from_uci(move) for move in line] for cpu, line in value}
+        else:
+            info[key] = value  # type: ignore
+    return info
+
+
+class EnginePool:
+    """
+    A pool of warm :class:`~chess.engine.SimpleEngine` instances that are
+    kept alive and reused across tasks, so that the cost of spawning the
+    engine process, the protocol handshake and loading evaluation networks
+    is only paid once per engine.
+
+    Engines are handed out with :func:`~chess.engine.EnginePool.engine()`.
+    Before an engine is handed out it is health-checked with a ping, and
+    engines that crashed, timed out or misbehaved are transparently replaced
+    with freshly spawned ones.
+
+    >>> import chess.engine
+    >>>
+    >>> with chess.engine.EnginePool("/usr/bin/stockfish", size=4) as pool:
+    ...     with pool.engine() as engine:
+    ...         info = engine.analyse(chess.Board(), chess.engine.Limit(depth=10))
+
+    The pool is thread-safe. It is not shared between processes: each
+    process (for example each :mod:`multiprocessing` worker) should own
+    its own pool.
+
+    :param command: Path of the engine executable, or a list including the
+        path and arguments.
+    :param size: Number of engine processes to keep alive.
+    :param Protocol: The engine protocol. Defaults to
+        :class:`~chess.engine.UciProtocol`.
+    :param options: Optional. Engine options that are configured on every
+        (re)spawned engine, for example ``{"Threads": 1, "Hash": 64}``.
+    :param cache: Optional. An :class:`~chess.engine.AnalysisCache` that
+        is attached to every engine in the pool.
+    :param timeout: Timeout passed to :class:`~chess.engine.SimpleEngine`.
+    :param host: Optional. An :class:`~chess.engine.EngineHost` that runs
+        all engines of the pool on one shared event loop.
+    :param telemetry: Optional. A :class:`~chess.telemetry.TelemetryRegistry`
+        that every engine of the pool reports to while it is alive.
+    :param popen_args: Additional arguments for
+        :func:`chess.engine.SimpleEngine.popen()`.
+    """
+
+    def __init__(self, command: Union[str, List[str]], *, size: int = 1, Protocol: Type[Protocol] = UciProtocol, options: ConfigMapping = {}, cache: Optional[AnalysisCache] = None, timeout: Optional[float] = 10.0, setpgrp: bool = False, host: Optional[EngineHost] = None, telemetry: Optional[chess.telemetry.TelemetryRegistry] = None, **popen_args: Any) -> None:
+        if size < 1:
+            raise ValueError(f"expected pool size >= 1, got {size}")
+
+        self.command = command
+        self.size = size
+        self.Protocol = Protocol
+        self.options = dict(options)
+        self.cache = cache
+        self.timeout = timeout
+        self.setpgrp = setpgrp
+        self.host = host
+        self.telemetry = telemetry
+        self.popen_args = popen_args
+
+        self.restarts = 0
+        """Number of engines that have been replaced after failing."""
+
+        self._lock = threading.Lock()
+        self._closed = False
+        self._idle: Deque[SimpleEngine] = collections.deque()
+        self._available = threading.Semaphore(size)
+        self._engines: List[SimpleEngine] = []
+
+        try:
+            for _ in range(size):
+                self._idle.append(self._spawn())
+        except:
+            self.close()
+            raise
+
+    def _spawn(self) -> SimpleEngine:
+        engine = SimpleEngine.popen(self.Protocol, self.command, timeout=self.timeout, setpgrp=self.setpgrp, host=self.host, **self.popen_args)
+        engine.cache = self.cache
+        try:
+            if self.telemetry is not None:
+                engine.enable_telemetry(self.telemetry)
+            if self.options:
+                engine.configure(self.options)
+        except:
+            engine.close()
+            raise
+        with self._lock:
+            self._engines.append(engine)
+        return engine
+
+    def _discard(self, engine: SimpleEngine) -> None:
+        with self._lock:
+            try:
+                self._engines.remove(engine)
+            except ValueError:
+                pass
+        if self.telemetry is not None and engine.telemetry is not None:
+            self.telemetry.unregister(engine.telemetry)
+        engine.close()
+
+    def _healthy(self, engine: SimpleEngine) -> bool:
+        if engine.returncode.done():
+            return False
+        try:
+            engine.ping()
+        except (EngineError, asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            LOGGER.exception("%s: Health check failed", engine)
+            return False
+        return True
+
+    def acquire(self, timeout: Optional[float] = None) -> SimpleEngine:
+        """
+        Takes an idle engine out of the pool, blocking until one is
+        available.
+
+        The engine is health-checked and restarted if necessary. It must be
+        returned with :func:`~chess.engine.EnginePool.release()`.
+
+        :raises: :exc:`TimeoutError` if no engine became available within
+            *timeout* seconds.
+        """
+        if not self._available.acquire(timeout=timeout):
+            raise TimeoutError(f"no engine available within {timeout} seconds")
+
+        try:
+            with self._lock:
+                if self._closed:
+                    raise EngineTerminatedError("engine pool closed")
+                engine = self._idle.popleft() if self._idle else None
+
+            if engine is None or not self._healthy(engine):
+                if engine is not None:
+                    LOGGER.warning("%s: Replacing unhealthy engine", engine)
+                    self._discard(engine)
+                    self.restarts += 1
+                engine = self._spawn()
+        except:
+            self._available.release()
+            raise
+
+        return engine
+
+    def release(self, engine: SimpleEngine, *, broken: bool = False) -> None:
+        """
+        Returns an engine to the pool.
+
+        :param broken: Discard the engine instead of reusing it, for example
+            because a command failed in an unknown state. A replacement
+            will be spawned on demand.
+        """
+        with self._lock:
+            reuse = not broken and not self._closed
+            if reuse:
+                self._idle.append(engine)
+
+        if not reuse:
+            self._discard(engine)
+            if broken:
+                self.restarts += 1
+
+        self._available.release()
+
+    @contextlib.contextmanager
+    def engine(self, timeout: Optional[float] = None) -> Generator[SimpleEngine, None, None]:
+        """
+        Context manager that acquires an engine and returns it to the pool
+        when done. If the block raises an engine error or times out, the
+        engine is considered broken and replaced.
+        """
+        engine = self.acquire(timeout)
+        broken = False
+        try:
+            yield engine
+        except (EngineError, asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            broken = True
+            raise
+        finally:
+            self.release(engine, broken=broken)
+
+    def close(self) -> None:
+        """
+        Shuts down all engines in the pool. Engines that are currently
+        handed out are closed when they are released.
+        """
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+
+        for engine in idle:
+            try:
+                engine.quit()
+            except (EngineError, asyncio.TimeoutError, concurrent.futures.TimeoutError):
+                pass
+            self._discard(engine)
+
+    def __enter__(self) -> EnginePool:
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        with self._lock:
+            return f"<{type(self).__name__} (command={self.command!r}, size={self.size}, idle={len(self._idle)})>"
+
+
+class EngineHost:
+    """
+    A single background thread and event loop shared by many
+    :class:`~chess.engine.SimpleEngine` instances.
+
+    By default every :class:`~chess.engine.SimpleEngine` runs its own event
+    loop on its own thread. Engines spawned with a host instead run as tasks
+    on the host's loop, so a process that manages many engines needs one
+    extra thread instead of one per engine.
+
+    Engines remain independent: each one can be closed on its own, and an
+    engine that crashes or times out does not affect the others.
+
+    >>> import chess.engine
+    >>>
+    >>> with chess.engine.EngineHost() as host:
+    ...     engines = [host.popen_uci("/usr/bin/stockfish") for _ in range(64)]
+    ...     info = engines[0].analyse(chess.Board(), chess.engine.Limit(depth=10))
+
+    Closing the host closes all engines that are still attached and stops
+    the thread. As with a :class:`~chess.engine.SimpleEngine`, a host that
+    is never closed keeps the process from exiting.
+    """
+
+    def __init__(self, *, name: str = "EngineHost", debug: bool = False) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._closed = False
+        self._tasks: Dict[concurrent.futures.Future[None], Any] = {}
+        run_in_background(self._serve, name=name, debug=debug)
+
+    async def _serve(self, future: concurrent.futures.Future[None]) -> None:
+        self.loop = asyncio.get_running_loop()
+        self._thread = threading.current_thread()
+        self._closing = asyncio.Event()
+        future.set_result(None)
+        await self._closing.wait()
+
+    def run(self, coroutine: Callable[[concurrent.futures.Future[T]], Coroutine[Any, Any, None]]) -> T:
+        """
+        Runs ``coroutine(future)`` as a task on the shared event loop, like
+        :func:`~chess.engine.run_in_background()`, and returns the result of
+        *future* as soon as it is resolved.
+        """
+        future: concurrent.futures.Future[T] = concurrent.futures.Future()
+
+        async def task() -> None:
+            try:
+                await coroutine(future)
+                future.cancel()
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+                else:
+                    LOGGER.exception("%s: Hosted task failed", self)
+
+        with self._lock:
+            if self._closed:
+                raise EngineError("engine host closed")
+            self._tasks = {t: result for t, result in self._tasks.items() if not t.done()}
+            hosted = asyncio.run_coroutine_threadsafe(task(), self.loop)
+            self._tasks[hosted] = None
+
+        result = future.result()
+        with self._lock:
+            if hosted in self._tasks:
+                self._tasks[hosted] = result
+        return result
+
+    def popen(self, Protocol: Type[Protocol], command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+        """Spawns and initializes an engine on the shared event loop."""
+        return SimpleEngine.popen(Protocol, command, timeout=timeout, setpgrp=setpgrp, host=self, **popen_args)
+
+    def popen_uci(self, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+        """Spawns and initializes a UCI engine on the shared event loop."""
+        return self.popen(UciProtocol, command, timeout=timeout, setpgrp=setpgrp, **popen_args)
+
+    def popen_xboard(self, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+        """Spawns and initializes an XBoard engine on the shared event loop."""
+        return self.popen(XBoardProtocol, command, timeout=timeout, setpgrp=setpgrp, **popen_args)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Closes all engines that are still attached, waits up to *timeout*
+        seconds for them to shut down, and stops the event loop.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            tasks = dict(self._tasks)
+
+        for result in tasks.values():
+            if isinstance(result, SimpleEngine):
+                result.close()
+        concurrent.futures.wait(list(tasks), timeout=timeout)
+
+        self.loop.call_soon_threadsafe(self._closing.set)
+        self._thread.join()
+
+    def __enter__(self) -> EngineHost:
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        with self._lock:
+            return f"<{type(self).__name__} (name={self.name!r}, tasks={sum(not t.done() for t in self._tasks)})>"
+
+
+class GameAnalysisSession:
+    """
+    Analyses every position of a game with a single engine, one ply after
+    the other.
+
+    All searches share the same *game* identity, so the engine is told about
+    a new game (``ucinewgame``) only once and keeps its transposition table
+    across plies. Positions of consecutive plies share most of their search
+    trees, so each search starts from the results of the previous one.
+
+    Walking the game in *reverse* fills the transposition table with the
+    positions that the searches of earlier plies will reach, which usually
+    lets them go deeper in the same time.
+
+    >>> import chess.engine
+    >>>
+    >>> with chess.engine.SimpleEngine.popen_uci("/usr/bin/stockfish") as engine:
+    ...     board = chess.Board()
+    ...     for san in ["e4", "e5", "Qh5", "Nc6", "Bc4", "Nf6", "Qxf7#"]:
+    ...         board.push_san(san)
+    ...     session = chess.engine.GameAnalysisSession(engine, board, reverse=True)
+    ...     infos = session.analyse(chess.engine.Limit(time=0.1))
+
+    :param engine: The :class:`~chess.engine.SimpleEngine` to use. Analysing
+        other games with the engine in between invalidates the table.
+    :param board: The final position of the game. Its move stack holds the
+        moves of the game.
+    :param reverse: Analyse the final position first and walk back to the
+        start.
+    :param game: Optional. An object that identifies the game. Defaults to
+        a new object, so that a new game starts with every session.
+    """
+
+    def __init__(self, engine: SimpleEngine, board: chess.Board, *, reverse: bool = False, game: object = None) -> None:
+        self.engine = engine
+        self.board = board
+        self.reverse = reverse
+        self.game = object() if game is None else game
+
+    def __len__(self) -> int:
+        return len(self.board.move_stack) + 1
+
+    def positions(self) -> Iterator[Tuple[int, chess.Board]]:
+        """
+        Yields the index of each position in the game, counted from the
+        start, and the position, in the order of the walk. The same board is
+        updated in place, so it must not be modified or kept around.
+        """
+        moves = self.board.move_stack
+        if self.reverse:
+            board = self.board.copy()
+            for index in range(len(moves), -1, -1):
+                yield index, board
+                if index:
+                    board.pop()
+        else:
+            board = self.board.root()
+            yield 0, board
+            for index, move in enumerate(moves, 1):
+                board.push(move)
+                yield index, board
+
+    def iter_analyse(self, limit: Limit, *, info: Info = INFO_ALL) -> Iterator[Tuple[int, InfoDict]]:
+        """Analyses the positions in the order of the walk, yielding the index and information of each."""
+        for index, board in self.positions():
+            yield index, self.engine.analyse(board, limit, game=self.game, info=info)
+
+    def analyse(self, limit: Limit, *, info: Info = INFO_ALL) -> List[InfoDict]:
+        """
+        Analyses all positions and returns their information in game order,
+        starting with the initial position, regardless of the walk order.
+        """
+        infos: List[InfoDict] = [{} for _ in range(len(self))]
+        for index, result in self.iter_analyse(limit, info=info):
+            infos[index] = result
+        return infos
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} (engine={self.engine!r}, plies={len(self) - 1}, reverse={self.reverse})>"
@@ -287,7 +287,10 @@ class ZobristHasher:
                 self.hash_ep_square(board) ^ self.hash_turn(board))
 
 
-def zobrist_hash(board: chess.Board, *, _hasher: Callable[[chess.Board], int] = ZobristHasher(POLYGLOT_RANDOM_ARRAY)) -> int:
+_POLYGLOT_HASHER = ZobristHasher(POLYGLOT_RANDOM_ARRAY)
+
+
+def zobrist_hash(board: chess.Board, *, _hasher: Callable[[chess.Board], int] = _POLYGLOT_HASHER) -> int:
     """
     Calculates the Polyglot Zobrist hash of the position.
 
@@ -295,7 +298,12 @@ def zobrist_hash(board: chess.Board, *, _hasher: Callable[[chess.Board], int] =
     an array. Which values are picked is decided by features of the
     position, such as piece positions, castling rights and en passant
     squares.
+
+    With the default array this is the incrementally maintained
+    :data:`chess.Board.zobrist_key`.
     """
+    if _hasher is _POLYGLOT_HASHER:
+        return board.zobrist_key
     return _hasher(board)
 
 
@@ -0,0 +1,327 @@
+# This file is part of the python-chess library.
+# Copyright (C) 2012-2021 Niklas Fiekas <niklas.fiekas@backscattering.de>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import bisect
+import http.server
+import json
+import os
+import threading
+import time
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+"""Upper bounds of the latency histogram buckets, in seconds."""
+
+
+class Histogram:
+    """A histogram of observed values with fixed, cumulative buckets."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Pairs of upper bound and number of values up to that bound, ending with infinity."""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"), ), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {_format_bound(bound): count for bound, count in self.cumulative()},
+        }
+
+
+HISTOGRAMS = {
+    "isready": "Seconds from isready (or ping) until readyok (or pong).",
+    "go": "Seconds from go until the first info line of the search.",
+    "bestmove": "Seconds from go until bestmove.",
+}
+
+GAUGES = ["nps", "hashfull", "tbhits"]
+
+
+class EngineTelemetry:
+    """
+    Instrumentation of a single engine, attached to a
+    :class:`~chess.engine.Protocol` with
+    :func:`~chess.engine.Protocol.enable_telemetry()`.
+
+    Records latency histograms of the UCI commands ``isready``, ``go`` and
+    the ``bestmove`` that ends a search, how long the engine spent
+    searching, how long Python spent handling the lines it sent, the
+    number of lines received, and the last ``nps``, ``hashfull`` and
+    ``tbhits`` the engine reported.
+
+    Recording happens on the event loop of the engine, while snapshots may
+    be taken from any thread.
+    """
+
+    def __init__(self, name: str = "engine") -> None:
+        self.name = name
+        self.pid: Optional[int] = None
+        self.started = time.time()
+
+        self.histograms = {kind: Histogram() for kind in HISTOGRAMS}
+        self.lines_sent = 0
+        self.lines_received = 0
+        self.info_lines = 0
+        self.python_seconds = 0.0
+        self.search_seconds = 0.0
+        self.gauges: Dict[str, Optional[int]] = {gauge: None for gauge in GAUGES}
+
+        self._lock = threading.Lock()
+        self._isready_at: Optional[float] = None
+        self._go_at: Optional[float] = None
+        self._first_info = False
+
+    @property
+    def searching(self) -> bool:
+        return self._go_at is not None
+
+    def line_sent(self, line: str) -> None:
+        self.lines_sent += 1
+        command = line.split(" ", 1)[0]
+        if command in ["isready", "ping"]:
+            self._isready_at = time.perf_counter()
+        elif command == "go":
+            self._go_at = time.perf_counter()
+            self._first_info = True
+
+    def line_received(self, line: str, seconds: float) -> None:
+        """Records a line from the engine and the time it took to handle it."""
+        now = time.perf_counter()
+        self.lines_received += 1
+        self.python_seconds += seconds
+
+        command = line.split(" ", 1)[0]
+        if command == "info":
+            self.info_lines += 1
+            if self._first_info and self._go_at is not None:
+                self._first_info = False
+                self._observe("go", now - seconds - self._go_at)
+            if "nps" in line or "hashfull" in line or "tbhits" in line:
+                self._gauges(line)
+        elif command == "bestmove" and self._go_at is not None:
+            elapsed = now - seconds - self._go_at
+            self._go_at = None
+            self.search_seconds += elapsed
+            self._observe("bestmove", elapsed)
+        elif command in ["readyok", "pong"] and self._isready_at is not None:
+            self._observe("isready", now - seconds - self._isready_at)
+            self._isready_at = None
+
+    def _gauges(self, line: str) -> None:
+        tokens = line.split(" ")
+        for i, token in enumerate(tokens):
+            if token in ["string", "pv"]:
+                break
+            elif token in self.gauges:
+                try:
+                    self.gauges[token] = int(tokens[i + 1])
+                except (ValueError, IndexError):
+                    pass
+
+    def _observe(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self.histograms[kind].observe(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the current values as a dictionary that can be serialized as JSON."""
+        with self._lock:
+            histograms = {kind: histogram.snapshot() for kind, histogram in self.histograms.items()}
+
+        uptime = max(time.time() - self.started, 1e-9)
+        return {
+            "name": self.name,
+            "pid": self.pid,
+            "uptime_seconds": uptime,
+            "searching": self.searching,
+            "lines_sent": self.lines_sent,
+            "lines_received": self.lines_received,
+            "info_lines": self.info_lines,
+            "lines_per_second": self.lines_received / uptime,
+            "search_seconds": self.search_seconds,
+            "python_seconds": self.python_seconds,
+            "utilization": min(self.search_seconds / uptime, 1.0),
+            "latency": histograms,
+            **{gauge: value for gauge, value in self.gauges.items()},
+        }
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} (name={self.name!r}, pid={self.pid}, lines_received={self.lines_received})>"
+
+
+class TelemetryRegistry:
+    """
+    A collection of :class:`~chess.telemetry.EngineTelemetry` that is
+    exported together, as a snapshot dictionary, as Prometheus text, to a
+    file, or from a local HTTP endpoint.
+
+    >>> import chess.engine
+    >>> import chess.telemetry
+    >>>
+    >>> registry = chess.telemetry.TelemetryRegistry()
+    >>> registry.serve(port=9101)  # http://127.0.0.1:9101/metrics
+    >>>
+    >>> engine = chess.engine.SimpleEngine.popen_uci("/usr/bin/stockfish")
+    >>> engine.enable_telemetry(registry)
+    """
+
+    def __init__(self, prefix: str = "chess_engine") -> None:
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._telemetry: List[EngineTelemetry] = []
+
+    def register(self, telemetry: EngineTelemetry) -> None:
+        with self._lock:
+            if telemetry not in self._telemetry:
+                self._telemetry.append(telemetry)
+
+    def unregister(self, telemetry: EngineTelemetry) -> None:
+        with self._lock:
+            if telemetry in self._telemetry:
+                self._telemetry.remove(telemetry)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._telemetry))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._telemetry)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Snapshots of all registered engines."""
+        return [telemetry.snapshot() for telemetry in self]
+
+    def prometheus(self) -> str:
+        """Renders all registered engines in the Prometheus text exposition format."""
+        snapshots = self.snapshot()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help: str, values: List[Tuple[str, Any]]) -> None:
+            lines.append(f"# HELP {self.prefix}_{name} {help}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+            for labels, value in values:
+                if value is not None:
+                    lines.append(f"{self.prefix}_{name}{{{labels}}} {_format_value(value)}")
+
+        labels = [_labels(snapshot) for snapshot in snapshots]
+        metric("up", "gauge", "Always 1 for registered engines.", [(label, 1) for label in labels])
+        metric("searching", "gauge", "1 while the engine is searching.", [(label, int(s["searching"])) for label, s in zip(labels, snapshots)])
+        metric("lines_sent_total", "counter", "Lines sent to the engine.", [(label, s["lines_sent"]) for label, s in zip(labels, snapshots)])
+        metric("lines_received_total", "counter", "Lines received from the engine.", [(label, s["lines_received"]) for label, s in zip(labels, snapshots)])
+        metric("info_lines_total", "counter", "Info lines received from the engine.", [(label, s["info_lines"]) for label, s in zip(labels, snapshots)])
+        metric("search_seconds_total", "counter", "Seconds the engine spent searching.", [(label, s["search_seconds"]) for label, s in zip(labels, snapshots)])
+        metric("python_seconds_total", "counter", "Seconds spent handling lines from the engine in Python.", [(label, s["python_seconds"]) for label, s in zip(labels, snapshots)])
+        metric("uptime_seconds", "gauge", "Seconds since telemetry was enabled.", [(label, s["uptime_seconds"]) for label, s in zip(labels, snapshots)])
+        for gauge in GAUGES:
+            metric(gauge, "gauge", f"Last {gauge} reported by the engine.", [(label, s[gauge]) for label, s in zip(labels, snapshots)])
+
+        for kind, help in HISTOGRAMS.items():
+            name = f"{self.prefix}_{kind}_seconds"
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} histogram")
+            for label, snapshot in zip(labels, snapshots):
+                histogram = snapshot["latency"][kind]
+                for bound, count in histogram["buckets"].items():
+                    lines.append(f"{name}_bucket{{{label},le=\"{bound}\"}} {count}")
+                lines.append(f"{name}_sum{{{label}}} {_format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{{{label}}} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, *, format: str = "prometheus") -> None:
+        """
+        Atomically writes all engines to *path*, as Prometheus text (for
+        example for the node exporter's textfile collector) or as JSON.
+        """
+        if format == "prometheus":
+            data = self.prometheus()
+        elif format == "json":
+            data = json.dumps(self.snapshot())
+        else:
+            raise ValueError(f"unknown telemetry format: {format!r}")
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9101) -> http.server.ThreadingHTTPServer:
+        """
+        Serves ``/metrics`` (Prometheus text) and ``/snapshot`` (JSON) on a
+        daemon thread. Call ``shutdown()`` on the returned server to stop.
+        """
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body = registry.prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/snapshot":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name=f"{type(self).__name__} ({host}:{server.server_port})", daemon=True).start()
+        return server
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} (engines={len(self)})>"
+
+
+def _labels(snapshot: Dict[str, Any]) -> str:
+    name = str(snapshot["name"]).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return f"engine=\"{name}\",pid=\"{snapshot['pid']}\""
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _format_value(value: Any) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -828,8 +828,8 @@ class _CrazyhouseBoardState(Generic[CrazyhouseBoardT], chess._BoardState[Crazyho
 
     def restore(self, board: CrazyhouseBoardT) -> None:
         super().restore(board)
-        board.pockets[chess.WHITE] = self.pockets_w
-        board.pockets[chess.BLACK] = self.pockets_b
+        board.pockets[chess.WHITE] = self.pockets_w.copy()
+        board.pockets[chess.BLACK] = self.pockets_b.copy()
 
 CrazyhousePocketT = TypeVar("CrazyhousePocketT", bound="CrazyhousePocket")
 
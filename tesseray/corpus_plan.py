@@ -0,0 +1,76 @@
+import collections
+import chess
+import chess.engine
+import chess.polyglot
+from typing import Counter, Dict, List, Tuple
+from pgn_shards import read_shard
+from worker_engines import get_engine_pool
+
+
+class CorpusPlan:
+    """
+    Distinct positions of a corpus, keyed by Polyglot Zobrist hash, and how
+    often each of them occurs in the mainlines of all games.
+    """
+
+    def __init__(self):
+        self.fens: Dict[int, str] = {}
+        self.counts: Counter[int] = collections.Counter()
+
+    def add(self, positions: List[Tuple[int, str]]) -> None:
+        for key, fen in positions:
+            self.counts[key] += 1
+            self.fens.setdefault(key, fen)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def unique(self) -> int:
+        return len(self.counts)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Positions in the corpus per distinct position."""
+        return self.total / self.unique if self.unique else 1.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"total": self.total, "unique": self.unique, "dedup_ratio": self.dedup_ratio}
+
+
+def game_positions(shard) -> List[Tuple[int, str]]:
+    """Keys and FENs of every mainline position of a game, in order."""
+    game = read_shard(shard)
+    board = game.board()
+    positions = [(chess.polyglot.zobrist_hash(board), board.fen())]
+    for move in game.mainline_moves():
+        board.push(move)
+        positions.append((chess.polyglot.zobrist_hash(board), board.fen()))
+    return positions
+
+
+def analyse_fen(args) -> None:
+    # The result is stored in the analysis cache attached to the engine.
+    fen, stockfish_path, cache_path, depth = args
+    with get_engine_pool(stockfish_path, cache_path).engine() as engine:
+        engine.analyse(chess.Board(fen), chess.engine.Limit(depth=depth))
+
+
+def plan_corpus(pool, shards) -> CorpusPlan:
+    """Collects the distinct positions of all games, parsing them in *pool*."""
+    plan = CorpusPlan()
+    for positions in pool.imap_unordered(game_positions, shards, chunksize=16):
+        plan.add(positions)
+    return plan
+
+
+def analyse_plan(pool, plan: CorpusPlan, stockfish_path, cache_path, depth=10) -> None:
+    """
+    Analyses every distinct position exactly once, spread over *pool*. The
+    results land in the analysis cache at *cache_path*, from which they are
+    fanned back out to every game that reached the position.
+    """
+    tasks = ((fen, stockfish_path, cache_path, depth) for fen in plan.fens.values())
+    for _ in pool.imap_unordered(analyse_fen, tasks, chunksize=16):
+        pass
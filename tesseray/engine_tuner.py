@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import time
+import chess
+import chess.engine
+import chess.pgn
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    """A number of concurrent engines and the options of each of them."""
+    engines: int
+    threads: int
+    hash: int
+
+    def __str__(self):
+        return f"{self.engines} x Threads={self.threads} Hash={self.hash}"
+
+
+def sample_positions(pgn_files, size=200, seed=0) -> List[str]:
+    """Reservoir sample of FENs of mainline positions from all games of *pgn_files*."""
+    rng = random.Random(seed)
+    sample: List[str] = []
+    seen = 0
+    for pgn_file in pgn_files:
+        with open(pgn_file) as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                board = game.board()
+                for move in game.mainline_moves():
+                    board.push(move)
+                    if board.is_game_over():
+                        continue
+                    seen += 1
+                    if len(sample) < size:
+                        sample.append(board.fen())
+                    else:
+                        i = rng.randrange(seen)
+                        if i < size:
+                            sample[i] = board.fen()
+    return sample
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime]
+
+
+class TunerCache:
+    """
+    Sample positions and measured throughput, stored as JSON in
+    *cache_dir*. Samples are keyed by the PGN files they were drawn from,
+    results by the engine binary, the machine and the search limit, so
+    that a rerun after a hardware or engine change measures again while
+    an unchanged setup is answered from the cache.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.samples_path = os.path.join(cache_dir, "samples.json")
+        self.results_path = os.path.join(cache_dir, "results.json")
+        self.samples = self._load(self.samples_path)
+        self.results = self._load(self.results_path)
+
+    @staticmethod
+    def _load(path) -> Dict:
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save(path, data) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+
+    def positions(self, pgn_files, size, seed) -> List[str]:
+        key = _fingerprint([_file_key(f) for f in pgn_files], size, seed)
+        if key not in self.samples:
+            self.samples[key] = sample_positions(pgn_files, size, seed)
+            self._save(self.samples_path, self.samples)
+        return self.samples[key]
+
+    def get(self, key) -> Optional[float]:
+        return self.results.get(key)
+
+    def put(self, key, positions_per_second) -> None:
+        self.results[key] = positions_per_second
+        self._save(self.results_path, self.results)
+
+
+async def _open_engine(stockfish_path, config: EngineConfig) -> chess.engine.Protocol:
+    _, protocol = await chess.engine.popen_uci(stockfish_path)
+    options = {}
+    if "Threads" in protocol.options:
+        options["Threads"] = config.threads
+    if "Hash" in protocol.options:
+        options["Hash"] = config.hash
+    await protocol.configure(options)
+    return protocol
+
+
+async def measure(stockfish_path, config: EngineConfig, fens, limit: chess.engine.Limit) -> float:
+    """
+    Analyses all *fens* with the engines of *config*, each engine taking
+    the next position as soon as it is idle, and returns positions per
+    second. Each engine searches one position before the clock starts.
+    """
+    protocols = await asyncio.gather(*(_open_engine(stockfish_path, config) for _ in range(config.engines)))
+    try:
+        await asyncio.gather(*(protocol.analyse(chess.Board(fens[i % len(fens)]), limit) for i, protocol in enumerate(protocols)))
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for fen in fens:
+            queue.put_nowait(chess.Board(fen))
+
+        async def work(protocol):
+            while not queue.empty():
+                board = queue.get_nowait()
+                # A new game for every position, so that no engine profits
+                # from the positions it searched before.
+                await protocol.analyse(board, limit, game=object())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(work(protocol) for protocol in protocols))
+        return len(fens) / (time.perf_counter() - start)
+    finally:
+        for protocol in protocols:
+            try:
+                await asyncio.wait_for(protocol.quit(), 10.0)
+            except (chess.engine.EngineError, asyncio.TimeoutError):
+                pass
+
+
+def candidate_configs(cpus, threads=None, hashes=None, engines=None, max_memory=None) -> List[EngineConfig]:
+    """
+    Configurations that use at most *cpus* search threads in total. By
+    default the engine count is swept in powers of two up to the number
+    that fills all cores with the given number of threads.
+    """
+    threads = threads or [t for t in (1, 2, 4, 8, 16) if t <= cpus]
+    hashes = hashes or [16, 64, 256]
+    configs = []
+    for t in threads:
+        counts = engines or sorted({n for n in (2 ** i for i in range(cpus.bit_length())) if n * t <= cpus} | {max(1, cpus // t)})
+        for n in counts:
+            if n * t > cpus:
+                continue
+            for h in hashes:
+                if max_memory is not None and n * h > max_memory:
+                    continue
+                configs.append(EngineConfig(n, t, h))
+    return configs
+
+
+def tune(stockfish_path, pgn_files, *, configs, limit, positions=200, seed=0, cache_dir="tune_cache", force=False) -> List[Dict]:
+    """Measures every configuration and returns the results, fastest first."""
+    cache = TunerCache(cache_dir)
+    fens = cache.positions(pgn_files, positions, seed)
+    machine = [os.cpu_count(), platform.machine(), platform.processor(), platform.node()]
+    limit_key = {"depth": limit.depth, "nodes": limit.nodes}
+
+    results = []
+    for config in configs:
+        key = _fingerprint(_file_key(stockfish_path), machine, limit_key, asdict(config), fens)
+        positions_per_second = None if force else cache.get(key)
+        cached = positions_per_second is not None
+        if not cached:
+            positions_per_second = asyncio.run(measure(stockfish_path, config, fens, limit))
+            cache.put(key, positions_per_second)
+        print(f"{str(config):<32} {positions_per_second:>10.1f} positions/s{' (cached)' if cached else ''}")
+        results.append({**asdict(config), "positions_per_second": positions_per_second})
+
+    return sorted(results, key=lambda result: result["positions_per_second"], reverse=True)
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweeps Threads, Hash and the number of concurrent engines and recommends the fastest configuration.")
+    parser.add_argument("--pgn-dir", default="test_data")
+    parser.add_argument("--engine", default="engines/stockfish")
+    parser.add_argument("--positions", type=int, default=200, help="number of sample positions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--nodes", type=int, help="node budget per position instead of a fixed depth")
+    parser.add_argument("--threads", type=_int_list, help="comma separated, default powers of two")
+    parser.add_argument("--hash", type=_int_list, help="comma separated, in MB, default 16,64,256")
+    parser.add_argument("--engines", type=_int_list, help="comma separated, default powers of two up to the core count")
+    parser.add_argument("--cpus", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-memory", type=int, help="total hash of all engines in MB")
+    parser.add_argument("--cache-dir", default="tune_cache")
+    parser.add_argument("--force", action="store_true", help="measure again even if results are cached")
+    args = parser.parse_args()
+
+    pgn_files = [os.path.join(args.pgn_dir, f) for f in sorted(os.listdir(args.pgn_dir)) if f.endswith(".pgn")]
+    limit = chess.engine.Limit(nodes=args.nodes) if args.nodes else chess.engine.Limit(depth=args.depth)
+    configs = candidate_configs(args.cpus, args.threads, args.hash, args.engines, args.max_memory)
+
+    results = tune(args.engine, pgn_files, configs=configs, limit=limit, positions=args.positions, seed=args.seed, cache_dir=args.cache_dir, force=args.force)
+    best = results[0]
+    print(f"Recommended: {best['engines']} engines with Threads={best['threads']} Hash={best['hash']} ({best['positions_per_second']:.1f} positions/s)")
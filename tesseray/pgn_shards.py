@@ -0,0 +1,31 @@
+import chess.pgn
+from typing import Iterator, NamedTuple, Optional
+
+
+class GameShard(NamedTuple):
+    """Location of a single game in a PGN file."""
+    path: str
+    offset: int
+    length: int
+
+
+def scan_shards(pgn_file, start=0) -> Iterator[GameShard]:
+    """
+    Scans a PGN file once and yields the location of every game, starting
+    at byte offset *start*. Only headers are parsed, so this is much cheaper
+    than reading the games.
+    """
+    with open(pgn_file) as pgn:
+        pgn.seek(start)
+        offset = start
+        while chess.pgn.skip_game(pgn):
+            end = pgn.tell()
+            yield GameShard(pgn_file, offset, end - offset)
+            offset = end
+
+
+def read_shard(shard: GameShard) -> Optional[chess.pgn.Game]:
+    """Seeks to a game and parses it."""
+    with open(shard.path) as pgn:
+        pgn.seek(shard.offset)
+        return chess.pgn.read_game(pgn)
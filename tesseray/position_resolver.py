@@ -0,0 +1,125 @@
+import chess
+import chess.engine
+import chess.polyglot
+import chess.syzygy
+import multiprocessing.util
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Centipawn score reported for tablebase wins, like Stockfish's TB_WIN.
+TB_WIN_SCORE = 20000
+
+
+class PositionResolver:
+    """
+    Answers positions without the engine where possible: positions in a
+    Polyglot opening book are theory, and positions with few enough pieces
+    are resolved by probing Syzygy tablebases.
+    """
+
+    def __init__(self, book_path=None, syzygy_path=None, max_pieces=7):
+        self.book = chess.polyglot.MemoryMappedReader(book_path) if book_path else None
+        self.tablebase = chess.syzygy.open_tablebase(syzygy_path) if syzygy_path else None
+        self.max_pieces = max_pieces
+        self.book_hits = 0
+        self.tablebase_hits = 0
+
+    def book_moves(self, board: chess.Board) -> Set[chess.Move]:
+        """Moves that the opening book knows in this position."""
+        if self.book is None:
+            return set()
+        moves = {entry.move for entry in self.book.find_all(board)}
+        if moves:
+            self.book_hits += 1
+        return moves
+
+    def probe(self, board: chess.Board) -> Optional[chess.engine.InfoDict]:
+        """
+        Resolves a position from the tablebases. Returns an info dictionary
+        with a score derived from WDL and the best move according to DTZ,
+        or None if the position is not covered.
+        """
+        if self.tablebase is None or chess.popcount(board.occupied) > self.max_pieces:
+            return None
+
+        try:
+            wdl = self.tablebase.probe_wdl(board)
+            if board.is_game_over():
+                return {"score": chess.engine.PovScore(_wdl_score(wdl, 0), board.turn), "pv": []}
+            dtz = self.tablebase.get_dtz(board, 0)
+
+            # The best move leaves the opponent with the worst outcome. Among
+            # equal outcomes prefer the fastest win or the slowest loss.
+            best_key: Optional[Tuple[int, int]] = None
+            best_move = None
+            for move in board.legal_moves:
+                board.push(move)
+                try:
+                    if board.is_checkmate():
+                        key = (-3, 0)
+                    else:
+                        key = (self.tablebase.probe_wdl(board), -self.tablebase.get_dtz(board, 0))
+                finally:
+                    board.pop()
+                if best_key is None or key < best_key:
+                    best_key, best_move = key, move
+        except KeyError:
+            # Missing table or castling rights.
+            return None
+
+        self.tablebase_hits += 1
+        return {"score": chess.engine.PovScore(_wdl_score(wdl, dtz), board.turn), "pv": [best_move], "string": "syzygy"}
+
+    def close(self) -> None:
+        if self.book is not None:
+            self.book.close()
+        if self.tablebase is not None:
+            self.tablebase.close()
+
+
+def _wdl_score(wdl, dtz) -> chess.engine.Score:
+    if wdl == 2:
+        return chess.engine.Cp(TB_WIN_SCORE - abs(dtz))
+    elif wdl == -2:
+        return chess.engine.Cp(-TB_WIN_SCORE + abs(dtz))
+    else:
+        # Draws and wins or losses spoiled by the 50-move rule.
+        return chess.engine.Cp(0)
+
+
+def analyse(engine, board, limit, resolver: Optional[PositionResolver] = None) -> chess.engine.InfoDict:
+    """Analyses a position, asking the engine only if the resolver can not."""
+    if resolver is not None:
+        info = resolver.probe(board)
+        if info is not None:
+            return info
+    return engine.analyse(board, limit)
+
+
+def analyse_many(engine, boards: Iterable[chess.Board], limit, resolver: Optional[PositionResolver] = None) -> List[chess.engine.InfoDict]:
+    """
+    Analyses several positions, in order. Positions that the resolver can
+    not answer are submitted to the engine in a single batch.
+    """
+    boards = list(boards)
+    infos = [resolver.probe(board) if resolver is not None else None for board in boards]
+    pending = [i for i, info in enumerate(infos) if info is None]
+    searched = engine.analyse_many([boards[i] for i in pending], limit)
+    try:
+        for info, i in zip(searched, pending):
+            infos[i] = info
+    finally:
+        searched.close()
+    return infos  # type: ignore
+
+
+# Resolvers are opened once in each worker process.
+_resolvers: Dict[Tuple[Optional[str], Optional[str]], PositionResolver] = {}
+
+def get_resolver(book_path=None, syzygy_path=None) -> Optional[PositionResolver]:
+    if not book_path and not syzygy_path:
+        return None
+    resolver = _resolvers.get((book_path, syzygy_path))
+    if resolver is None:
+        resolver = _resolvers[(book_path, syzygy_path)] = PositionResolver(book_path, syzygy_path)
+        multiprocessing.util.Finalize(None, resolver.close, exitpriority=10)
+    return resolver
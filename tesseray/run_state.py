@@ -0,0 +1,94 @@
+import dataclasses
+import json
+import os
+import sqlite3
+from typing import Any, Iterator, List, Tuple, Type
+
+from blunder_records import BlunderRecord
+from pgn_shards import GameShard, scan_shards
+
+
+class RunState:
+    """
+    Durable record of a blunder run, stored in SQLite so that reruns only
+    analyse new files and games appended to known files, and an interrupted
+    run resumes where it stopped.
+
+    Each file is remembered by size and mtime. A file that grew is assumed
+    to have games appended and is scanned from where the previous scan
+    stopped. A file that shrank or changed without growing is analysed
+    again from scratch.
+    """
+
+    def __init__(self, path, record_type: Type[Any] = BlunderRecord):
+        self.path = path
+        self.record_type = record_type
+        self._db = sqlite3.connect(path)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, scanned_to INTEGER);
+            CREATE TABLE IF NOT EXISTS games (path TEXT, offset INTEGER, length INTEGER, game_id INTEGER, done INTEGER DEFAULT 0, PRIMARY KEY (path, offset));
+            CREATE TABLE IF NOT EXISTS results (path TEXT, offset INTEGER, record TEXT);
+            CREATE INDEX IF NOT EXISTS results_game ON results (path, offset);
+        """)
+
+    def _forget(self, pgn_file) -> None:
+        self._db.execute("DELETE FROM files WHERE path = ?", (pgn_file, ))
+        self._db.execute("DELETE FROM games WHERE path = ?", (pgn_file, ))
+        self._db.execute("DELETE FROM results WHERE path = ?", (pgn_file, ))
+
+    def _scan(self, pgn_file) -> None:
+        stat = os.stat(pgn_file)
+        row = self._db.execute("SELECT size, mtime, scanned_to FROM files WHERE path = ?", (pgn_file, )).fetchone()
+        if row is not None:
+            size, mtime, scanned_to = row
+            if stat.st_size == size and stat.st_mtime == mtime:
+                return
+            if stat.st_size <= size:
+                # Rewritten rather than appended to.
+                self._forget(pgn_file)
+                scanned_to = 0
+        else:
+            scanned_to = 0
+
+        game_id = self._db.execute("SELECT COALESCE(MAX(game_id), 0) FROM games WHERE path = ?", (pgn_file, )).fetchone()[0]
+        with self._db:
+            for shard in scan_shards(pgn_file, scanned_to):
+                game_id += 1
+                self._db.execute("INSERT OR IGNORE INTO games (path, offset, length, game_id) VALUES (?, ?, ?, ?)", (pgn_file, shard.offset, shard.length, game_id))
+                scanned_to = shard.offset + shard.length
+            self._db.execute("INSERT OR REPLACE INTO files (path, size, mtime, scanned_to) VALUES (?, ?, ?, ?)", (pgn_file, stat.st_size, stat.st_mtime, scanned_to))
+
+    def pending_shards(self, pgn_files) -> List[Tuple[GameShard, int]]:
+        """
+        Scans new and changed files and returns (shard, game_id) for every
+        game that has not been analysed yet.
+        """
+        pending = []
+        for pgn_file in pgn_files:
+            self._scan(pgn_file)
+            for offset, length, game_id in self._db.execute("SELECT offset, length, game_id FROM games WHERE path = ? AND NOT done ORDER BY offset", (pgn_file, )):
+                pending.append((GameShard(pgn_file, offset, length), game_id))
+        return pending
+
+    def complete(self, shard: GameShard, records) -> None:
+        """Atomically stores the results of a game and marks it as done."""
+        with self._db:
+            self._db.execute("DELETE FROM results WHERE path = ? AND offset = ?", (shard.path, shard.offset))
+            self._db.executemany("INSERT INTO results (path, offset, record) VALUES (?, ?, ?)",
+                                 [(shard.path, shard.offset, json.dumps(dataclasses.asdict(record))) for record in records])
+            self._db.execute("UPDATE games SET done = 1 WHERE path = ? AND offset = ?", (shard.path, shard.offset))
+
+    def records(self) -> Iterator[Any]:
+        """Yields the stored results of all completed games."""
+        for (record, ) in self._db.execute("SELECT record FROM results ORDER BY path, offset, rowid"):
+            yield self.record_type(**json.loads(record))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
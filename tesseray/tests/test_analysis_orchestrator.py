@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_orchestrator import AnalysisOrchestrator
+
+PGN = """
+[Event "?"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 *
+
+[Event "?"]
+
+1. d4 d5 2. c4 e6 *
+"""
+
+# Answers the handshake, then exits on every search.
+CRASHING_ENGINE = textwrap.dedent("""
+    import sys
+    for line in sys.stdin:
+        command = line.split()[0] if line.split() else ""
+        if command == "uci":
+            print("id name Crasher")
+            print("uciok", flush=True)
+        elif command == "isready":
+            print("readyok", flush=True)
+        elif command in ["go", "quit"]:
+            sys.exit(1)
+""")
+
+
+class AnalysisOrchestratorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_pgn(self, copies):
+        pgn_file = os.path.join(self.tmp.name, "games.pgn")
+        with open(pgn_file, "w") as f:
+            f.write(PGN * copies)
+        return pgn_file
+
+    def test_engine_fails_to_spawn(self):
+        # More positions than the queue holds, so the reader would block
+        # if nothing noticed that no worker is left.
+        pgn_file = self.write_pgn(50)
+        orchestrator = AnalysisOrchestrator(os.path.join(self.tmp.name, "missing-engine"), engines=2, queue_size=4)
+        with self.assertRaises(OSError):
+            asyncio.run(asyncio.wait_for(orchestrator.run([pgn_file]), 30.0))
+        self.assertEqual(orchestrator.games, 0)
+
+    def test_failed_positions_complete_the_game(self):
+        pgn_file = self.write_pgn(1)
+        engine = os.path.join(self.tmp.name, "crasher.py")
+        with open(engine, "w") as f:
+            f.write(CRASHING_ENGINE)
+
+        finished = []
+        orchestrator = AnalysisOrchestrator([sys.executable, engine], engines=2, queue_size=4, on_blunders=finished.append)
+        asyncio.run(asyncio.wait_for(orchestrator.run([pgn_file]), 60.0))
+
+        self.assertEqual(orchestrator.games, 2)
+        self.assertEqual(orchestrator.failures, 7 + 5)
+        self.assertEqual(finished, [[], []])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+import chess.variant
+
+MOVES = "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6".split()
+
+
+class BoardCopyTestCase(unittest.TestCase):
+
+    def play(self, board):
+        for san in MOVES:
+            board.push_san(san)
+        return board
+
+    def test_copy_then_mutate_keeps_the_original_lists(self):
+        board = self.play(chess.Board())
+        move_stack, stack = board.move_stack, board._stack
+
+        # Branch off like the PGN reader does for a variation.
+        variation = board.copy()
+        variation_lists = variation.move_stack, variation._stack
+        last = variation.pop()
+        variation.push_san("d5")
+        board.push_san("c3")
+        board.pop()
+        board.pop()
+        board.push(last)
+
+        # The original board never copies its lists, and the copy made its
+        # own exactly once, in copy().
+        self.assertIs(board.move_stack, move_stack)
+        self.assertIs(board._stack, stack)
+        self.assertIsNot(variation.move_stack, move_stack)
+        self.assertIs(variation.move_stack, variation_lists[0])
+        self.assertIs(variation._stack, variation_lists[1])
+
+    def test_copies_are_independent(self):
+        board = self.play(chess.Board())
+        fen = board.fen()
+        variation = board.copy()
+        while variation.move_stack:
+            variation.pop()
+        self.assertEqual(variation.fen(), chess.STARTING_FEN)
+        self.assertEqual(board.fen(), fen)
+        self.assertEqual(len(board.move_stack), len(MOVES))
+
+        board.push_san("c3")
+        self.assertEqual(variation.move_stack, [])
+        board.pop()
+        self.assertEqual(board.fen(), fen)
+
+    def test_limited_copy(self):
+        board = self.play(chess.Board())
+        copy = board.copy(stack=2)
+        self.assertEqual(copy.move_stack, board.move_stack[-2:])
+        copy.pop()
+        copy.pop()
+        self.assertRaises(IndexError, copy.pop)
+        self.assertEqual(len(board.move_stack), len(MOVES))
+
+        board.pop()
+        board.pop()
+        self.assertEqual(copy.fen(), board.fen())
+
+    def test_crazyhouse_copy_keeps_pockets(self):
+        board = chess.variant.CrazyhouseBoard()
+        for san in ["e4", "d5", "exd5", "Qxd5", "Nc3", "Qa5"]:
+            board.push_san(san)
+        fen = board.fen()
+        variation = board.copy()
+        variation.push_san("P@d5")
+        self.assertEqual(str(board.pockets[chess.WHITE]), "p")
+        variation.pop()
+        variation.pop()
+        variation.push_san("Qd8")
+        self.assertEqual(board.fen(), fen)
+
+        board.push_san("P@d5")
+        board.pop()
+        self.assertEqual(str(variation.pockets[chess.WHITE]), "p")
+        self.assertEqual(board.fen(), fen)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,16 @@
+import chess.engine
+import multiprocessing.util
+from typing import Dict, Optional, Tuple
+
+# Engines are kept warm in each worker process and reused across tasks.
+_engine_pools: Dict[Tuple[str, Optional[str]], chess.engine.EnginePool] = {}
+
+def get_engine_pool(stockfish_path, cache_path=None):
+    pool = _engine_pools.get((stockfish_path, cache_path))
+    if pool is None:
+        cache = chess.engine.AnalysisCache(cache_path) if cache_path else None
+        pool = _engine_pools[(stockfish_path, cache_path)] = chess.engine.EnginePool(stockfish_path, cache=cache)
+        multiprocessing.util.Finalize(None, pool.close, exitpriority=10)
+        if cache is not None:
+            multiprocessing.util.Finalize(None, cache.close, exitpriority=5)
+    return pool